@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Provisioning Benchmark
+
+Runs create_servers.py and RunnerDeployer end to end against the
+simulated API in fake_hcloud.py and reports wall time, Hetzner API call
+counts and peak concurrency per scenario. Nothing is created at Hetzner
+and no GitHub API is called.
+
+    python3 benchmark.py --servers 8 --json bench.json
+    python3 benchmark.py --baseline bench.json   # fail on API call regressions
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Callable, Optional
+
+import create_servers
+from fake_hcloud import FakeHetzner
+
+
+# Allowed growth of a scenario's API calls over the baseline before
+# --baseline fails (call counts vary a little with poll timing)
+DEFAULT_TOLERANCE = 0.15
+
+# Seconds a script may take to import in a fresh interpreter, and the
+# modules it must not import at startup (see create_servers.hcloud_client())
+DEFAULT_IMPORT_BUDGET = 0.25
+HEAVY_MODULES = ("hcloud", "paramiko", "requests")
+
+
+@contextlib.contextmanager
+def offline_github(latency: float = 0.2):
+    """
+    Answer the GitHub calls of create_servers.py locally.
+
+    Token validation succeeds after `latency` seconds and the org has no
+    runners, so nothing leaves the machine.
+    """
+    validate, list_runners = create_servers.validate_github_token, create_servers.list_org_runners
+    create_servers.validate_github_token = lambda token, organisation: time.sleep(latency)
+    create_servers.list_org_runners = lambda token, organisation, max_age=0: []
+    try:
+        yield
+    finally:
+        create_servers.validate_github_token, create_servers.list_org_runners = validate, list_runners
+
+
+def cli(*args) -> list[str]:
+    """Command line for create_servers.main() with dummy tokens."""
+    return [*map(str, args), "--hetzner-token", "fake", "--github-token", "fake", "--ssh-key", "UPLOAD"]
+
+
+def run_scenario(
+    name: str,
+    api: FakeHetzner,
+    run: Callable[[FakeHetzner], int],
+    setup: Optional[Callable[[FakeHetzner], None]] = None,
+    verbose: bool = False,
+) -> dict:
+    """
+    Time one scenario.
+
+    Args:
+        name: Scenario name
+        api: Simulated project to run against
+        run: Runs the scenario and returns its exit code
+        setup: Prepares the project; not measured
+        verbose: Show the scripts' output instead of discarding it
+
+    Returns:
+        Dict with the scenario's measurements
+    """
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    create_servers.track_rate_limit(api)
+    with output:
+        if setup:
+            setup(api)
+        api.reset_stats()
+        start = time.time()
+        try:
+            exit_code = run(api)
+        except SystemExit as e:
+            exit_code = e.code
+    wall_time = time.time() - start
+
+    return {
+        "scenario": name,
+        "exit_code": exit_code,
+        "wall_time": round(wall_time, 2),
+        "api_calls": api.total_calls,
+        "calls": dict(sorted(api.calls.items())),
+        "errors_injected": api.errors,
+        "peak_in_flight": api.peak_in_flight,
+        "peak_servers": api.peak_servers,
+    }
+
+
+def scenarios(servers: int, parallelism: int) -> list[tuple]:
+    """Return (name, FakeHetzner kwargs, run, setup) for every scenario."""
+    half = max(1, servers // 2)
+
+    def create(count, server_type="cax31", index=0):
+        return lambda api: create_servers.main(
+            cli("create", "--count", count, "--index", index, "--server-type", server_type,
+                "--parallelism", parallelism),
+            client=api,
+        )
+
+    def deploy(api):
+        import deploy_runners
+
+        with tempfile.NamedTemporaryFile("w", suffix=".key") as key:
+            # Only read, never used: the runner install over SSH is skipped
+            key.write("benchmark")
+            key.flush()
+            deployer = deploy_runners.RunnerDeployer(
+                hetzner_token="fake",
+                github_token="fake",
+                ssh_key_path=key.name,
+                client=api,
+            )
+        try:
+            indices = list(range(min(servers, len(deploy_runners.MACHINE_NAMES))))
+            result = deployer.deploy_servers(indices, install_runner=False)
+            deployer.delete_all_servers()
+        finally:
+            deployer.close()
+        return 1 if result["failed"] else 0
+
+    def delete_github_down(api):
+        # Deregistering the runners fails with a DNS error once the servers
+        # are gone; the delete must still report its result
+        names = sorted(api.server_records)
+        list_runners, urlopen = create_servers.list_org_runners, urllib.request.urlopen
+
+        def unreachable(*args, **kwargs):
+            raise urllib.error.URLError("Name or service not known")
+
+        create_servers.list_org_runners = lambda token, organisation, max_age=0: [
+            {"id": i, "name": f"{name}-01", "status": "offline", "busy": False} for i, name in enumerate(names)
+        ]
+        urllib.request.urlopen = unreachable
+        try:
+            result = create_servers.delete_servers(api, names, github_token="fake", parallelism=parallelism)
+        finally:
+            create_servers.list_org_runners, urllib.request.urlopen = list_runners, urlopen
+        return 0 if result["deleted"] == len(names) and result["runners_removed"] == 0 else 1
+
+    def inject_errors(api):
+        api.fail_next("servers.create", "rate_limit_exceeded", times=2)
+        api.fail_next("servers.get_all", "server_error")
+
+    return [
+        ("create", {}, create(servers), None),
+        # cax41 sold out after half the fleet: placement falls back to cax31
+        ("create-capacity", {"capacity": {"cax41": {"fsn1": half, "nbg1": 0, "hel1": 0}}},
+         create(servers, "cax41"), None),
+        # Creates rejected by the rate limit and a failed listing, all retried
+        ("create-errors", {}, create(servers), inject_errors),
+        ("reconcile", {},
+         lambda api: create_servers.main(cli("reconcile", "--count", servers, "--parallelism", parallelism), client=api),
+         create(half)),
+        ("delete", {},
+         lambda api: create_servers.main(cli("delete", "--count", servers, "--parallelism", parallelism), client=api),
+         create(servers)),
+        ("delete-github-down", {}, delete_github_down, create(servers)),
+        ("deploy-runners", {}, deploy, None),
+    ]
+
+
+def measure_startup(module: str, budget: float) -> dict:
+    """
+    Import module in a fresh interpreter and check it against the budget.
+
+    The import time is taken from -X importtime (cumulative, excluding the
+    interpreter's own startup). The entry fails if it is over budget or if
+    any of HEAVY_MODULES was loaded.
+    """
+    code = f"import sys, {module}; print('loaded:', *(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    match = re.search(rf"^import time:\s+\d+ \|\s+(\d+) \| {module}$", proc.stderr, re.MULTILINE)
+    import_time = int(match.group(1)) / 1e6 if match else None
+    loaded = [line for line in proc.stdout.splitlines() if line.startswith("loaded:")]
+    heavy = loaded[-1].split()[1:] if loaded else []
+    ok = proc.returncode == 0 and import_time is not None and import_time <= budget and not heavy
+    return {
+        "scenario": f"import-{module}",
+        "exit_code": 0 if ok else 1,
+        "wall_time": round(import_time, 3) if import_time is not None else None,
+        "api_calls": 0,
+        "calls": {},
+        "errors_injected": 0,
+        "peak_in_flight": 0,
+        "peak_servers": 0,
+        "heavy_modules": heavy,
+    }
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    """Return a message for every scenario whose API calls regressed."""
+    previous = {entry["scenario"]: entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        before = previous.get(entry["scenario"])
+        if before and entry["api_calls"] > before["api_calls"] * (1 + tolerance):
+            regressions.append(
+                f"{entry['scenario']}: {entry['api_calls']} API calls, baseline {before['api_calls']}"
+            )
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the provisioning code paths against a simulated Hetzner API"
+    )
+    parser.add_argument(
+        "--servers",
+        type=int,
+        default=8,
+        help="Fleet size per scenario (default: 8)",
+    )
+    parser.add_argument(
+        "--parallelism",
+        type=int,
+        default=create_servers.DEFAULT_PARALLELISM,
+        help=f"--parallelism passed to create_servers.py (default: {create_servers.DEFAULT_PARALLELISM})",
+    )
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        help="Only run this scenario (repeatable)",
+    )
+    parser.add_argument(
+        "--json",
+        help="Write the results to this file",
+    )
+    parser.add_argument(
+        "--baseline",
+        help="Results file of an earlier run; exit 1 if API calls grew beyond --tolerance",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help=f"Allowed API call growth over the baseline (default: {DEFAULT_TOLERANCE})",
+    )
+    parser.add_argument(
+        "--import-budget",
+        type=float,
+        default=DEFAULT_IMPORT_BUDGET,
+        help=f"Seconds each script may take to import (default: {DEFAULT_IMPORT_BUDGET})",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Show the scripts' output",
+    )
+    args = parser.parse_args(argv)
+
+    results = []
+    for module in ("create_servers", "deploy_runners"):
+        if args.scenario and f"import-{module}" not in args.scenario:
+            continue
+        print(f"Measuring import of {module}...", file=sys.stderr)
+        results.append(measure_startup(module, args.import_budget))
+    with offline_github():
+        for name, settings, run, setup in scenarios(args.servers, args.parallelism):
+            if args.scenario and name not in args.scenario:
+                continue
+            print(f"Running {name}...", file=sys.stderr)
+            results.append(run_scenario(name, FakeHetzner(**settings), run, setup, args.verbose))
+
+    print(f"{'scenario':<22} {'exit':>4} {'wall s':>7} {'calls':>6} {'errors':>6} {'in flight':>9} {'servers':>7}")
+    for entry in results:
+        print(
+            f"{entry['scenario']:<22} {entry['exit_code']!s:>4} {entry['wall_time'] or 0:>7.2f} "
+            f"{entry['api_calls']:>6} {entry['errors_injected']:>6} {entry['peak_in_flight']:>9} "
+            f"{entry['peak_servers']:>7}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failed = [entry["scenario"] for entry in results if entry["exit_code"] != 0]
+    if failed:
+        print(f"Failed scenarios: {', '.join(failed)}", file=sys.stderr)
+        return 1
+
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"[REGRESSION] {message}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
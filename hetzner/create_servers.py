@@ -8,32 +8,63 @@ Creates N Hetzner Cloud servers with specified configuration.
 from __future__ import annotations
 
 import argparse
+import contextlib
+import fcntl
+import functools
+import hashlib
+import http.client
+import io
 import json
 import os
+import random
+import re
+import string
 import sys
+import tempfile
+import threading
 import time
 import urllib.error
+import urllib.parse
 import urllib.request
-
-print("[DEBUG] Script started, importing modules...")
-
-try:
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Optional
+
+# The hcloud SDK (and requests under it) takes longer to import than the
+# rest of the script; it is only imported by the code paths that need it
+# (see hcloud_client()). delete goes through HetznerREST instead.
+if TYPE_CHECKING:
     from hcloud import Client
-    from hcloud.images import Image
-    from hcloud.server_types import ServerType
-    from hcloud.ssh_keys import SSHKey
-    from hcloud.servers.domain import Server
-    from hcloud._exceptions import APIException
-    print("[DEBUG] All imports successful")
-except ImportError as e:
-    print(f"Missing required library: {e}")
-    print("Install with: pip install hcloud")
-    sys.exit(1)
+
+print("[DEBUG] Script started")
 
 
 # Server name prefix
 SERVER_PREFIX = "hetzner-runner"
 
+# Labels attached to every runner server, so the whole fleet can be listed
+# with a single label-filtered API call
+SERVER_LABELS = {"role": "gh-runner"}
+RUNNER_LABEL_SELECTOR = ",".join(f"{k}={v}" for k, v in SERVER_LABELS.items())
+
+# GitHub labels (label_primary, label_secondary) of the runners jobs run on
+RUNNER_LABELS = ("alfa", "images")
+
+# Standby pool (see replenish_pool() and claim_standby()): servers that are
+# booted and registered, but whose runners carry labels no job asks for
+# until they are claimed. The pool label on the server tracks which is which.
+POOL_PREFIX = f"{SERVER_PREFIX}-pool"
+POOL_LABEL = "pool"
+POOL_IDLE = "idle"
+POOL_ACTIVE = "active"
+STANDBY_RUNNER_LABELS = ("standby", "hetzner-pool")
+
+# Ephemeral servers (--ephemeral, see run_ephemeral_fleet()): one JIT
+# runner each, which takes a single job; the server is reaped once the
+# runner has deregistered itself
+EPHEMERAL_PREFIX = f"{SERVER_PREFIX}-ephemeral"
+DEFAULT_EPHEMERAL_INTERVAL = 60
+
 # Server type fallback order (largest to smallest)
 SERVER_TYPE_FALLBACKS = {
     "cax41": ["cax41", "cax31", "cax21"],
@@ -51,6 +82,1225 @@ MAX_RUNNERS_PER_TYPE = {
     "cax21": 1,
 }
 
+GITHUB_API = "https://api.github.com"
+HETZNER_API = "https://api.hetzner.cloud/v1"
+
+# Server statuses, as in hcloud.servers.domain.Server
+STATUS_RUNNING = "running"
+STATUS_OFF = "off"
+STATUS_UNKNOWN = "unknown"
+
+# How long --wait-for-runners waits for runners to register with GitHub
+DEFAULT_RUNNER_TIMEOUT = 900
+
+# autoscale: seconds after a scale event before the fleet may shrink, and
+# how many servers beyond the demand are kept when it does
+DEFAULT_AUTOSCALE_COOLDOWN = 600
+DEFAULT_AUTOSCALE_HYSTERESIS = 1
+DEFAULT_MAX_SERVERS = 8
+
+# reap: seconds all of a server's runners must have been idle or offline
+DEFAULT_IDLE_WINDOW = 1800
+
+# Results shared between invocations on the same machine, e.g. the one
+# create job per matrix index (see StateCache)
+STATE_DIR_ENV = "HETZNER_STATE_DIR"
+TOKEN_VALIDATION_TTL = 600
+RUNNER_LIST_TTL = 30
+RUNNER_VERSION_TTL = 3600
+
+# Default number of concurrent create workers. Each worker issues a handful
+# of API calls per poll, so keep this well below Hetzner's 3600 req/h limit.
+DEFAULT_PARALLELISM = 4
+
+
+# Retries of Hetzner API calls (see hcloud_call())
+API_RETRIES = 6
+API_BACKOFF_BASE = 1.0
+API_BACKOFF_CAP = 30.0
+
+# Start spacing out requests when fewer than this many are left in the
+# current rate limit window
+RATE_LIMIT_RESERVE = 100
+
+# Hetzner error codes meaning the request was rejected without being
+# executed, so it is always safe to send again
+REJECTED_ERROR_CODES = ("rate_limit_exceeded", "locked", "conflict", "maintenance", 429, 503)
+
+# Error codes where the request may or may not have been executed; only
+# retried for idempotent calls
+TRANSIENT_ERROR_CODES = ("timeout", "server_error", "bad_gateway", "service_error", 500, 502, 504)
+
+
+class RateLimitTracker:
+    """
+    Tracks Hetzner's RateLimit-* response headers and spaces out requests.
+
+    Hetzner allows RateLimit-Limit requests per hour, refilled at a constant
+    rate. Once fewer than RATE_LIMIT_RESERVE are left, throttle() hands out
+    send slots one refill interval apart from a schedule shared by every
+    thread, so a large fleet run slows down to the refill rate instead of
+    running into 429s. With no requests left, the next slot is at
+    RateLimit-Reset.
+    """
+
+    def __init__(self, reserve: int = RATE_LIMIT_RESERVE):
+        self.reserve = reserve
+        self.limit = None
+        self.remaining = None
+        self.reset = None
+        self.throttled = 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, headers) -> None:
+        """Record the rate limit headers of a response."""
+        try:
+            limit = int(headers["RateLimit-Limit"])
+            remaining = int(headers["RateLimit-Remaining"])
+            reset = int(headers["RateLimit-Reset"])
+        except (KeyError, ValueError):
+            return
+        with self._lock:
+            self.limit, self.remaining, self.reset = limit, remaining, reset
+
+    def refill_interval(self) -> float:
+        """Seconds until the rate limit window regains one request."""
+        return 3600.0 / self.limit if self.limit else 1.0
+
+    def throttle(self) -> None:
+        """Wait for the next send slot if the remaining budget is running low."""
+        with self._lock:
+            remaining = self.remaining
+            if remaining is None or remaining >= self.reserve:
+                return
+            now = time.time()
+            slot = max(now, self._next_slot)
+            if remaining <= 0 and self.reset:
+                slot = max(slot, self.reset)
+            self._next_slot = slot + self.refill_interval()
+            delay = slot - now
+            self.throttled += delay
+        if delay > 0:
+            print(f"[DEBUG] {remaining} API requests left in the rate limit window, waiting {delay:.1f}s")
+            time.sleep(delay)
+
+
+# One tracker per process: every client in a run uses the same token
+rate_limit = RateLimitTracker()
+
+
+def hcloud_client(token: str, application_name: str = "gh-runner-deployer") -> Client:
+    """Create an hcloud client (see track_rate_limit()), importing the SDK on first use."""
+    try:
+        from hcloud import Client
+    except ImportError as e:
+        print(f"Missing required library: {e}")
+        print("Install with: pip install hcloud")
+        sys.exit(1)
+    return track_rate_limit(Client(token=token, application_name=application_name, application_version="1.0.0"))
+
+
+def track_rate_limit(client: Client) -> Client:
+    """
+    Feed the rate limit headers of every response of client to rate_limit.
+
+    Also turns off the SDK's own retries, so hcloud_call() alone decides
+    what is sent again; otherwise a create could be repeated after a
+    timeout, and the two retry loops would multiply.
+    """
+    # pylint: disable=protected-access
+    client._client._retry_max_retries = 0
+    session = client._client._session
+    session.hooks["response"].append(lambda response, *args, **kwargs: rate_limit.update(response.headers))
+    return client
+
+
+def is_retryable(error: Exception, idempotent: bool = True) -> bool:
+    """
+    Classify an error from the Hetzner API.
+
+    Args:
+        error: Exception raised by an hcloud call
+        idempotent: Whether the call is safe to repeat if it may have
+            been executed already
+
+    Returns:
+        True if the call should be retried
+    """
+    if isinstance(error, api_error_types()):
+        if error.code in REJECTED_ERROR_CODES:
+            return True
+        return idempotent and error.code in TRANSIENT_ERROR_CODES
+    # An error can only come from requests if something imported it
+    requests = sys.modules.get("requests")
+    if requests is not None:
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            # Never reached the API
+            return True
+        if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return idempotent
+    if isinstance(error, (urllib.error.URLError, TimeoutError, ConnectionError)):
+        # HetznerREST; the request may or may not have arrived
+        return idempotent
+    return False
+
+
+def api_error_types() -> tuple:
+    """Exception types of Hetzner API error responses that may be raised."""
+    exceptions = sys.modules.get("hcloud._exceptions")
+    if exceptions is None:
+        # The SDK is not loaded, so only HetznerREST can have failed
+        return (HetznerAPIError,)
+    return (HetznerAPIError, exceptions.APIException)
+
+
+def hcloud_call(fn, *args, idempotent: bool = True, retries: int = API_RETRIES, **kwargs):
+    """
+    Call an hcloud client method with throttling and retries.
+
+    Transient failures (429, locked, 5xx, connection errors) are retried
+    with full-jitter exponential backoff. Calls that create something pass
+    idempotent=False, so they are only repeated when the API rejected them
+    outright, never after a timeout that may have gone through.
+
+    Args:
+        fn: Bound hcloud method, e.g. client.servers.create
+        idempotent: Whether the call is safe to repeat
+        retries: Maximum number of retries
+
+    Returns:
+        Whatever fn returns
+    """
+    for attempt in range(retries + 1):
+        rate_limit.throttle()
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == retries or not is_retryable(e, idempotent):
+                raise
+            delay = random.uniform(0, min(API_BACKOFF_CAP, API_BACKOFF_BASE * 2 ** attempt))
+            if isinstance(e, api_error_types()) and e.code in ("rate_limit_exceeded", 429):
+                delay = max(delay, rate_limit.refill_interval())
+            name = getattr(fn, "__qualname__", repr(fn))
+            print(f"[WARNING] {name} failed ({e}), retry {attempt + 1}/{retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+
+class HetznerAPIError(Exception):
+    """An error response of the Hetzner API, as raised by HetznerREST."""
+
+    def __init__(self, code, message: str):
+        super().__init__(f"{message} ({code})")
+        self.code = code
+        self.message = message
+
+
+class HetznerREST:
+    """
+    Minimal Hetzner API client on urllib.
+
+    Covers only what delete_servers() needs (listing and deleting servers,
+    polling actions), with the method names of hcloud.Client, so teardown
+    jobs don't have to import the SDK. Feeds rate_limit itself.
+    """
+
+    def __init__(self, token: str, endpoint: str = HETZNER_API, timeout: float = 30):
+        self.token = token
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.servers = _RESTServers(self)
+
+    def request(self, method: str, url: str, params: Optional[dict] = None, data: Optional[dict] = None) -> dict:
+        """Send one API request and return the decoded response body."""
+        full_url = self.endpoint + url
+        if params:
+            full_url += "?" + urllib.parse.urlencode(params, doseq=True)
+        body = json.dumps(data).encode() if data is not None else None
+        req = urllib.request.Request(full_url, data=body, method=method)
+        req.add_header("Authorization", f"Bearer {self.token}")
+        req.add_header("User-Agent", "gh-runner-deployer/1.0.0")
+        if body is not None:
+            req.add_header("Content-Type", "application/json")
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                rate_limit.update(resp.headers)
+                payload = resp.read()
+        except urllib.error.HTTPError as e:
+            rate_limit.update(e.headers)
+            try:
+                error = json.loads(e.read())["error"]
+                raise HetznerAPIError(error["code"], error["message"]) from None
+            except (ValueError, KeyError, TypeError):
+                raise HetznerAPIError(e.code, f"HTTP {e.code} on {method} {url}") from None
+        return json.loads(payload) if payload else {}
+
+
+class _RESTAction:
+    def __init__(self, client: HetznerREST, data: dict):
+        self.client = client
+        self.id = data["id"]
+        self.command = data.get("command")
+        self.status = data.get("status")
+
+    def wait_until_finished(self, max_retries: int = 100) -> None:
+        for _ in range(max_retries):
+            self.status = self.client.request("GET", f"/actions/{self.id}")["action"]["status"]
+            if self.status == "success":
+                return
+            if self.status == "error":
+                raise HetznerAPIError("action_failed", f"Action {self.id} ({self.command}) failed")
+            time.sleep(1)
+        raise HetznerAPIError("timeout", f"Action {self.id} ({self.command}) did not finish")
+
+
+class _RESTServers:
+    def __init__(self, client: HetznerREST):
+        self.client = client
+
+    def get_all(self, label_selector: Optional[str] = None) -> list:
+        servers = []
+        page = 1
+        while page:
+            params = {"per_page": 50, "page": page}
+            if label_selector:
+                params["label_selector"] = label_selector
+            payload = self.client.request("GET", "/servers", params=params)
+            servers.extend(
+                SimpleNamespace(id=s["id"], name=s["name"], status=s["status"], labels=s.get("labels", {}))
+                for s in payload["servers"]
+            )
+            page = payload.get("meta", {}).get("pagination", {}).get("next_page")
+        return servers
+
+    def delete(self, server) -> _RESTAction:
+        return _RESTAction(self.client, self.client.request("DELETE", f"/servers/{server.id}")["action"])
+
+
+class Tracer:
+    """
+    Records timed spans of the provisioning phases.
+
+    Spans are thread-safe and can be nested. write() exports them either as
+    JSON lines (one span per line) or, for a path ending in .json, as a
+    Chrome trace-event file that chrome://tracing and Perfetto can open.
+    """
+
+    def __init__(self):
+        self.spans: list[dict] = []
+        self._lock = threading.Lock()
+        self._threads: dict[int, int] = {}
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attrs):
+        """
+        Time the enclosed block as span `name`.
+
+        The yielded dict holds the span's attributes; add to it to record
+        outcomes. An exception leaving the block is recorded as "error".
+        """
+        start = time.time()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs["error"] = str(e) or type(e).__name__
+            raise
+        finally:
+            end = time.time()
+            thread = threading.current_thread()
+            with self._lock:
+                tid = self._threads.setdefault(thread.ident, len(self._threads) + 1)
+                self.spans.append({
+                    "name": name,
+                    "start": start,
+                    "end": end,
+                    "duration": round(end - start, 3),
+                    "thread": thread.name,
+                    "tid": tid,
+                    "attrs": attrs,
+                })
+
+    def write(self, path: str) -> None:
+        """Write the recorded spans to path (Chrome trace if it ends in .json)."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["start"])
+        with open(path, "w") as f:
+            if path.endswith(".json"):
+                origin = spans[0]["start"] if spans else 0
+                events = [
+                    {"name": "thread_name", "ph": "M", "pid": 1, "tid": span["tid"], "args": {"name": span["thread"]}}
+                    for span in {span["tid"]: span for span in spans}.values()
+                ]
+                events += [
+                    {
+                        "name": span["name"],
+                        "ph": "X",
+                        "pid": 1,
+                        "tid": span["tid"],
+                        "ts": int((span["start"] - origin) * 1e6),
+                        "dur": int((span["end"] - span["start"]) * 1e6),
+                        "args": span["attrs"],
+                    }
+                    for span in spans
+                ]
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+            else:
+                for span in spans:
+                    f.write(json.dumps(span, default=str) + "\n")
+
+
+# One tracer per process, like rate_limit
+tracer = Tracer()
+
+
+class LineWriter:
+    """
+    Text stream wrapper that never interleaves the lines of two threads.
+
+    print() writes its text and the line end separately, so lines printed
+    concurrently can be spliced into each other. Each thread's output is
+    held here until it ends a line and is then written whole under one
+    lock, so every line on the wrapped stream comes from a single thread.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def write(self, text: str) -> int:
+        pending = getattr(self._local, "pending", "") + text
+        end = pending.rfind("\n") + 1
+        self._local.pending = pending[end:]
+        if end:
+            with self._lock:
+                self.stream.write(pending[:end])
+        return len(text)
+
+    def flush(self) -> None:
+        pending = getattr(self._local, "pending", "")
+        self._local.pending = ""
+        with self._lock:
+            if pending:
+                self.stream.write(pending)
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class MilestoneStream:
+    """
+    Reports each server's milestones as NDJSON while the batch is running.
+
+    Off until enable() (--stream). Every milestone is one JSON line on
+    stdout, flushed at once, so whatever reads the script's output can use
+    the first ready server instead of waiting for the final document.
+    enable() wraps stdout in a LineWriter, so the log lines of the worker
+    threads can never split a JSON line. With
+    a GitHub output file, the servers that reached each milestone so far
+    and the first ready one are appended as step outputs as well (a later
+    line of the same name wins).
+    """
+
+    # Step output listing the servers that reached each milestone
+    OUTPUTS = {"created": "servers-created", "running": "servers-running", "runners_online": "servers-online"}
+
+    def __init__(self):
+        self.enabled = False
+        self.output_path: Optional[str] = None
+        self.first_ready: Optional[str] = None
+        self._reached: dict[str, list[str]] = {}
+        self._lock = threading.Lock()
+
+    def enable(self, output_path: Optional[str] = None) -> None:
+        """Start streaming; also append step outputs to output_path if given."""
+        self.enabled = True
+        self.output_path = output_path
+        if not isinstance(sys.stdout, LineWriter):
+            sys.stdout = LineWriter(sys.stdout)
+
+    def emit(self, event: str, server: str, ready: bool = False, **fields) -> None:
+        """
+        Report that server reached milestone `event`.
+
+        ready marks the server's last milestone (running, or runners_online
+        when waiting for runners); the first such server is first-ready.
+        """
+        if not self.enabled:
+            return
+        record = {"event": event, "server": server, "time": round(time.time(), 3), **fields}
+        with self._lock:
+            outputs = []
+            if event in self.OUTPUTS:
+                reached = self._reached.setdefault(event, [])
+                reached.append(server)
+                outputs.append(f"{self.OUTPUTS[event]}={','.join(reached)}")
+            if ready and self.first_ready is None:
+                self.first_ready = server
+                outputs.append(f"first-ready={server}")
+            sys.stdout.write(json.dumps(record, default=str) + "\n")
+            sys.stdout.flush()
+            if self.output_path and outputs:
+                try:
+                    with open(self.output_path, "a") as f:
+                        f.write("\n".join(outputs) + "\n")
+                except OSError as e:
+                    print(f"[WARNING] Could not write step outputs: {e}")
+
+
+# Streams milestones of every server created in this process (see --stream)
+milestones = MilestoneStream()
+
+
+class Journal:
+    """
+    Append-only record of every server's provisioning steps, for --resume.
+
+    Each step (intent, created, running, runners_online, done) is one JSON
+    line with the server name and Hetzner ID, flushed to disk before the
+    script moves on, so the file is intact whenever a run is cancelled. A
+    line cut short by a crash is skipped when reading. Off until a path is
+    set (main() does so with --resume or --journal). compact() drops the
+    servers that were finished, so the file only grows with the incomplete
+    ones. Appends and compaction hold an exclusive flock on <path>.lock, so
+    invocations sharing the state directory never lose each other's lines.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Hold the journal against other threads and other processes."""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", mode=0o700, exist_ok=True)
+            # A separate lock file, because compact() replaces the journal
+            with open(f"{self.path}.lock", "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                yield
+
+    def record(self, server: str, step: str, server_id: Optional[int] = None, **fields) -> None:
+        """Append step for server; gives up on the journal after a write error."""
+        if not self.path:
+            return
+        line = json.dumps(
+            {"time": round(time.time(), 3), "server": server, "id": server_id, "step": step, **fields},
+            default=str,
+        )
+        try:
+            with self._locked(), open(self.path, "a") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            print(f"[WARNING] Could not write journal {self.path}, not journaling this run: {e}")
+            self.path = None
+
+    def servers(self) -> dict[str, dict]:
+        """
+        Return the last provisioning attempt of each server in the journal.
+
+        Every intent starts a new attempt; the later steps add the server's
+        ID and fields. Each entry has "steps", the set of steps reached.
+        """
+        attempts: dict[str, dict] = {}
+        try:
+            with open(self.path) as f:
+                lines = f.readlines()
+        except (OSError, TypeError):
+            return attempts
+        for line in lines:
+            try:
+                entry = json.loads(line)
+                name, step = entry.pop("server"), entry.pop("step")
+            except (ValueError, KeyError, AttributeError):
+                continue
+            if step == "intent" or name not in attempts:
+                attempts[name] = {"id": None, "steps": set()}
+            attempts[name].update({key: value for key, value in entry.items() if value is not None})
+            attempts[name]["steps"].add(step)
+        return attempts
+
+    def compact(self) -> None:
+        """Rewrite the journal without the servers whose last attempt is done."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with self._locked():
+                done = {name for name, attempt in self.servers().items() if "done" in attempt["steps"]}
+                with open(self.path) as f:
+                    lines = f.readlines()
+                kept = []
+                for line in lines:
+                    try:
+                        if json.loads(line)["server"] in done:
+                            continue
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    kept.append(line)
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".tmp")
+                with os.fdopen(fd, "w") as f:
+                    f.writelines(kept)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[WARNING] Could not compact journal {self.path}: {e}")
+
+
+# Journal of every server created in this process (see --journal)
+journal = Journal()
+
+
+class ResourceCache:
+    """
+    Per-run cache of Hetzner list calls.
+
+    SSH keys, server types, images and the project's server list are each
+    fetched once and shared by every server created or deleted in the run.
+    Call invalidate() after a mutation so the next lookup re-lists.
+    """
+
+    def __init__(self, client: Client):
+        self.client = client
+        self._lock = threading.Lock()
+        self._entries: dict = {}
+        self.fetches = 0
+
+    def _get(self, kind: str, fetch):
+        with self._lock:
+            if kind not in self._entries:
+                with tracer.span("list", kind=kind):
+                    self._entries[kind] = fetch()
+                self.fetches += 1
+            return self._entries[kind]
+
+    def invalidate(self, kind: Optional[str] = None) -> None:
+        """Drop one cached listing (e.g. "servers"), or all of them."""
+        with self._lock:
+            if kind is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(kind, None)
+
+    def record_server(self, server, deleted: bool = False) -> None:
+        """
+        Apply a create or delete to the cached server list in place.
+
+        Cheaper than invalidate("servers") when many workers mutate the
+        fleet in parallel, as nobody has to re-list the project.
+        """
+        with self._lock:
+            servers = self._entries.get("servers")
+            if servers is None:
+                return
+            servers = [s for s in servers if s.name != server.name]
+            if not deleted:
+                servers.append(server)
+            self._entries["servers"] = servers
+
+    def ssh_keys(self) -> list:
+        return self._get("ssh_keys", lambda: hcloud_call(self.client.ssh_keys.get_all))
+
+    def server_types(self) -> list:
+        return self._get("server_types", lambda: hcloud_call(self.client.server_types.get_all))
+
+    def images(self) -> list:
+        return self._get("images", lambda: hcloud_call(self.client.images.get_all))
+
+    def snapshots(self) -> list:
+        """Runner snapshots (see build_snapshot())."""
+        selector = ",".join(f"{k}={v}" for k, v in SNAPSHOT_LABELS.items())
+        return self._get(
+            "snapshots",
+            lambda: hcloud_call(self.client.images.get_all, type=["snapshot"], label_selector=selector),
+        )
+
+    def servers(self) -> list:
+        return self._get("servers", lambda: hcloud_call(self.client.servers.get_all))
+
+    def ssh_key(self, name: str):
+        """Return the SSH key called name, or None."""
+        return next((key for key in self.ssh_keys() if key.name == name), None)
+
+    def server_type(self, name: str):
+        """Return the server type called name, or None."""
+        return next((t for t in self.server_types() if t.name == name), None)
+
+    def server(self, name: str):
+        """Return the server called name, or None."""
+        return next((server for server in self.servers() if server.name == name), None)
+
+
+class SharedPoller:
+    """
+    One background poller shared by many concurrent waiters.
+
+    A single thread calls _fetch() once per tick and wakes every waiter
+    with the fresh snapshot, instead of each waiter polling the API on its
+    own. The poll interval starts at min_interval and backs off towards
+    max_interval while nothing changes; any change, or kick(), resets it.
+    The thread only runs while somebody is waiting. fetched_at is the time
+    of the poll being compared in _changed(), so subclasses can date each
+    change by the poll that first showed it rather than by when a waiter
+    got to look.
+    """
+
+    name = "shared-poller"
+
+    def __init__(self, min_interval: float, max_interval: float, backoff: float = 1.5):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.polls = 0
+        self.fetched_at: Optional[float] = None
+
+        self._cond = threading.Condition()
+        self._snapshot: dict = {}
+        self._waiters = 0
+        self._interval = min_interval
+        self._thread = None
+
+    def _fetch(self) -> dict:
+        """Return the current state, keyed by name."""
+        raise NotImplementedError
+
+    def _changed(self, key: str, previous, current) -> bool:
+        """Return True (and log) if an entry changed between two polls."""
+        return previous is None
+
+    def kick(self) -> None:
+        """Reset the poll interval to the fast end, e.g. right after a create."""
+        with self._cond:
+            self._interval = self.min_interval
+            self._cond.notify_all()
+
+    def get(self, key: str):
+        """Return the last seen entry for key, or None."""
+        with self._cond:
+            return self._snapshot.get(key)
+
+    def _wait(self, check, timeout: float):
+        """
+        Block until check(snapshot) returns something truthy.
+
+        Returns:
+            The value returned by check, or None on timeout
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            self._waiters += 1
+            self._ensure_polling()
+            try:
+                while True:
+                    result = check(self._snapshot)
+                    if result:
+                        return result
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return None
+                    self._cond.wait(remaining)
+            finally:
+                self._waiters -= 1
+
+    def _ensure_polling(self) -> None:
+        # Caller holds self._cond
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._poll_loop, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _poll_loop(self) -> None:
+        while True:
+            with self._cond:
+                if self._waiters == 0:
+                    self._thread = None
+                    return
+            try:
+                snapshot = self._fetch()
+            except Exception as e:
+                print(f"[WARNING] {self.name} poll failed: {e}")
+                snapshot = None
+            fetched_at = time.time()
+
+            with self._cond:
+                self.polls += 1
+                self.fetched_at = fetched_at
+                if snapshot is not None:
+                    changed = False
+                    for key, current in snapshot.items():
+                        if self._changed(key, self._snapshot.get(key), current):
+                            changed = True
+                    self._snapshot = snapshot
+                    self._cond.notify_all()
+                    if changed:
+                        self._interval = self.min_interval
+                interval = self._interval
+                self._interval = min(self._interval * self.backoff, self.max_interval)
+                # Sleep, but wake early on kick()
+                self._cond.wait(interval)
+
+
+class ServerStatusWatcher(SharedPoller):
+    """
+    Shared server status poller for many concurrent waiters.
+
+    Instead of every waiter calling servers.get_by_name() on its own, the
+    whole fleet is listed with a single label-filtered servers.get_all()
+    call per tick. Servers usually change state within seconds of being
+    created, so polling starts fast and slows down from there.
+    """
+
+    name = "server-status-watcher"
+
+    def __init__(
+        self,
+        client: Client,
+        label_selector: str = RUNNER_LABEL_SELECTOR,
+        min_interval: float = 1.0,
+        max_interval: float = 10.0,
+        backoff: float = 1.5,
+    ):
+        super().__init__(min_interval, max_interval, backoff)
+        self.client = client
+        self.label_selector = label_selector
+        # Server name -> (status, time of the poll that first showed it)
+        self._since: dict[str, tuple[str, float]] = {}
+
+    def _fetch(self) -> dict:
+        servers = hcloud_call(self.client.servers.get_all, label_selector=self.label_selector)
+        return {server.name: server for server in servers}
+
+    def _changed(self, key: str, previous, current) -> bool:
+        if previous is None or previous.status != current.status:
+            print(f"[DEBUG] {key}: Status={current.status}")
+            self._since[key] = (current.status, self.fetched_at)
+            return True
+        return False
+
+    def status_since(self, name: str, status: str) -> Optional[float]:
+        """Return when server `name` was first seen in `status`, if that is its last seen status."""
+        with self._cond:
+            since = self._since.get(name)
+        return since[1] if since and since[0] == status else None
+
+    def wait_for_status(self, name: str, status: str = STATUS_RUNNING, timeout: float = 300):
+        """
+        Block until server `name` reports `status`.
+
+        Args:
+            name: Server name
+            status: Status to wait for (default: running)
+            timeout: Maximum time to wait in seconds
+
+        Returns:
+            The last seen server object (check its status for a timeout),
+            or None if the server never showed up in the listing
+        """
+        def check(snapshot):
+            server = snapshot.get(name)
+            return server if server is not None and server.status == status else None
+
+        return self._wait(check, timeout) or self.get(name)
+
+
+class ActionStatusWatcher(SharedPoller):
+    """
+    Shared poller for the create actions of a fleet.
+
+    Every action somebody waits for is looked up with one batched GET
+    /actions per tick (50 IDs per request, like wait_for_actions()),
+    instead of every waiter reloading its own action.
+    """
+
+    name = "action-status-watcher"
+
+    def __init__(
+        self,
+        client: Client,
+        min_interval: float = 1.0,
+        max_interval: float = 5.0,
+        backoff: float = 1.5,
+    ):
+        super().__init__(min_interval, max_interval, backoff)
+        self.client = client
+        self._ids: set[int] = set()
+
+    def _fetch(self) -> dict:
+        with self._cond:
+            ids = sorted(self._ids)
+        statuses = {}
+        for i in range(0, len(ids), 50):
+            response = hcloud_call(
+                self.client.request,
+                "GET", "/actions", params={"id": ids[i:i + 50], "per_page": 50}
+            )
+            for action in response.get("actions", []):
+                statuses[action["id"]] = action["status"]
+        return statuses
+
+    def _changed(self, key: int, previous, current) -> bool:
+        return previous != current
+
+    def wait_for_action(self, action_id: int, timeout: float = 300) -> str:
+        """
+        Block until action action_id has finished.
+
+        Returns:
+            The action's status: "success", "error", or "running" if it
+            did not finish in time
+        """
+        def check(snapshot):
+            status = snapshot.get(action_id)
+            return status if status not in (None, "running") else None
+
+        with self._cond:
+            self._ids.add(action_id)
+        try:
+            return self._wait(check, timeout) or "running"
+        finally:
+            with self._cond:
+                self._ids.discard(action_id)
+
+
+class RunnerStatusWatcher(SharedPoller):
+    """
+    Shared poller for the GitHub organisation's self-hosted runners.
+
+    One paginated listing of the org runners per tick serves every server
+    waiting for its runners to come online. Runners register minutes after
+    boot, so this polls far less often than ServerStatusWatcher.
+    """
+
+    name = "runner-status-watcher"
+
+    def __init__(
+        self,
+        github_token: str,
+        organisation: str,
+        min_interval: float = 5.0,
+        max_interval: float = 30.0,
+        backoff: float = 1.5,
+    ):
+        super().__init__(min_interval, max_interval, backoff)
+        self.github_token = github_token
+        self.organisation = organisation
+        # Runner name -> (status, time of the poll that first showed it)
+        self._since: dict[str, tuple[str, float]] = {}
+
+    def _fetch(self) -> dict:
+        runners = list_org_runners(self.github_token, self.organisation)
+        return {runner["name"]: runner for runner in runners}
+
+    def _changed(self, key: str, previous, current) -> bool:
+        if previous is None or previous["status"] != current["status"]:
+            print(f"[DEBUG] Runner {key}: {current['status']}")
+            self._since[key] = (current["status"], self.fetched_at)
+            return True
+        return False
+
+    def online_since(self, runners: list[dict]) -> Optional[float]:
+        """Return when the last of `runners` was first seen online, or None if one was not."""
+        with self._cond:
+            since = [self._since.get(runner["name"]) for runner in runners]
+        if not since or any(entry is None or entry[0] != "online" for entry in since):
+            return None
+        return max(entry[1] for entry in since)
+
+    def runners_for(self, server_name: str) -> list[dict]:
+        """Return the last seen runners registered by server_name."""
+        with self._cond:
+            return runners_of_server(self._snapshot.values(), server_name)
+
+    def wait_for_runners(self, server_name: str, count: int, timeout: float = 900) -> list[dict]:
+        """
+        Block until `count` runners of server_name are online.
+
+        Runners installed by armbian-config are named after the server
+        (runner_name=<server name>), so they are matched by that prefix.
+
+        Args:
+            server_name: Server name
+            count: Number of runners expected to come online
+            timeout: Maximum time to wait in seconds
+
+        Returns:
+            The online runners (fewer than count on timeout)
+        """
+        def check(snapshot):
+            online = [
+                runner for runner in runners_of_server(snapshot.values(), server_name)
+                if runner["status"] == "online"
+            ]
+            return online if len(online) >= count else None
+
+        result = self._wait(check, timeout)
+        if result is not None:
+            return result
+        return [runner for runner in self.runners_for(server_name) if runner["status"] == "online"]
+
+
+def runners_of_server(runners, server_name: str) -> list[dict]:
+    """Return the runners whose name marks them as installed on server_name."""
+    prefix = f"{server_name}-"
+    return [runner for runner in runners if runner["name"].startswith(prefix)]
+
+
+class StateCache:
+    """
+    Short-lived results shared by sibling invocations of this script.
+
+    Entries are small JSON files in $HETZNER_STATE_DIR (default: a
+    directory in the system temp dir). Their names are a SHA-256 of the
+    GitHub token and what was asked, so the token itself is never written.
+    The cache is best effort: any I/O problem counts as a miss.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+
+    def root(self) -> str:
+        """Return the directory the entries are kept in."""
+        return (
+            self.directory
+            or os.environ.get(STATE_DIR_ENV)
+            or os.path.join(tempfile.gettempdir(), "hetzner-runner-state")
+        )
+
+    def _path(self, kind: str, github_token: str, key: str) -> str:
+        digest = hashlib.sha256(f"{kind}\0{key}\0{github_token}".encode()).hexdigest()
+        return os.path.join(self.root(), f"{kind}-{digest}.json")
+
+    def get(self, kind: str, github_token: str, key: str, max_age: float):
+        """Return the value stored at most max_age seconds ago, or None."""
+        try:
+            with open(self._path(kind, github_token, key)) as f:
+                entry = json.load(f)
+            if time.time() - entry["stored_at"] <= max_age:
+                return entry["value"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def put(self, kind: str, github_token: str, key: str, value) -> None:
+        """Store value for siblings; written atomically and readable by us only."""
+        path = self._path(kind, github_token, key)
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"stored_at": time.time(), "value": value}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[DEBUG] Could not write state cache {path}: {e}")
+
+
+# One cache per process, like rate_limit
+state_cache = StateCache()
+
+
+def github_request(github_token: str, url: str, method: str = "GET", data: Optional[dict] = None) -> urllib.request.Request:
+    """Build an authenticated GitHub REST API request."""
+    body = json.dumps(data).encode() if data is not None else None
+    req = urllib.request.Request(url, data=body, method=method)
+    req.add_header("Accept", "application/vnd.github+json")
+    req.add_header("Authorization", f"Bearer {github_token}")
+    req.add_header("X-GitHub-Api-Version", "2022-11-28")
+    if body is not None:
+        req.add_header("Content-Type", "application/json")
+    return req
+
+
+def github_get(github_token: str, url: str) -> dict:
+    """GET a GitHub REST API URL and return the decoded JSON body."""
+    with urllib.request.urlopen(github_request(github_token, url), timeout=15) as resp:
+        return json.load(resp)
+
+
+def github_get_all(github_token: str, url: str, key: str) -> list[dict]:
+    """
+    GET every page of a GitHub REST API listing and return its `key` items.
+
+    url must not have a page parameter; pages of 100 are requested until
+    total_count items were read or a page comes back empty.
+    """
+    items = []
+    page = 1
+    while True:
+        payload = github_get(github_token, f"{url}{'&' if '?' in url else '?'}per_page=100&page={page}")
+        items.extend(payload.get(key, []))
+        if not payload.get(key) or len(items) >= payload.get("total_count", 0):
+            return items
+        page += 1
+
+
+def list_org_runners(github_token: str, organisation: str, max_age: float = 0) -> list[dict]:
+    """
+    List every self-hosted runner of the organisation.
+
+    Pages through /orgs/<org>/actions/runners 100 at a time, so the whole
+    listing costs ceil(total / 100) requests. A listing stored by this or
+    a sibling invocation less than max_age seconds ago is reused; every
+    fresh listing is stored.
+    """
+    if max_age:
+        runners = state_cache.get("org-runners", github_token, organisation, max_age)
+        if runners is not None:
+            print(f"[DEBUG] Reusing runner listing of {organisation} from the state cache")
+            return runners
+
+    runners = []
+    page = 1
+    while True:
+        url = f"{GITHUB_API}/orgs/{organisation}/actions/runners?per_page=100&page={page}"
+        with urllib.request.urlopen(github_request(github_token, url), timeout=15) as resp:
+            payload = json.load(resp)
+        runners.extend(payload.get("runners", []))
+        if not payload.get("runners") or len(runners) >= payload.get("total_count", 0):
+            state_cache.put("org-runners", github_token, organisation, runners)
+            return runners
+        page += 1
+
+
+def set_runner_labels(github_token: str, organisation: str, runner_id: int, labels) -> None:
+    """Replace the custom labels of a self-hosted runner."""
+    url = f"{GITHUB_API}/orgs/{organisation}/actions/runners/{runner_id}/labels"
+    req = github_request(github_token, url, method="PUT", data={"labels": list(labels)})
+    urllib.request.urlopen(req, timeout=15).close()
+
+
+class GitHubSession:
+    """
+    Keep-alive connections to the GitHub REST API, shared by all threads.
+
+    Each request borrows an idle connection (or opens one) and puts it back
+    afterwards, so a batch of calls costs one TLS handshake per concurrent
+    worker instead of one per call.
+    """
+
+    def __init__(self, github_token: str, endpoint: str = GITHUB_API, timeout: float = 15):
+        self.github_token = github_token
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        url = urllib.parse.urlsplit(self.endpoint)
+        connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        return connection_class(url.netloc, timeout=self.timeout)
+
+    def request(self, method: str, path: str, data: Optional[dict] = None) -> dict:
+        """
+        Send a request and return the decoded JSON body.
+
+        Raises:
+            urllib.error.HTTPError: On an HTTP error status, as urlopen() would
+        """
+        req = github_request(self.github_token, f"{self.endpoint}{path}", method, data)
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request(method, req.selector, body=req.data, headers=dict(req.header_items()))
+                response = connection.getresponse()
+                body = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # An idle connection the server has closed in the meantime
+                connection.close()
+                if attempt:
+                    raise
+            except Exception:
+                connection.close()
+                raise
+        with self._lock:
+            self._idle.append(connection)
+        if response.status >= 400:
+            raise urllib.error.HTTPError(req.full_url, response.status, response.reason, response.headers, io.BytesIO(body))
+        return json.loads(body) if body else {}
+
+
+@functools.lru_cache(maxsize=None)
+def github_session(github_token: str) -> GitHubSession:
+    """Return the GitHubSession shared by every call made with github_token."""
+    return GitHubSession(github_token)
+
+
+def latest_runner_version(github_token: str) -> str:
+    """
+    Return the version of the latest GitHub Actions runner release.
+
+    JIT runners are started directly rather than installed by
+    armbian-config, so the script picks the release they download. The
+    answer is kept in the state cache for RUNNER_VERSION_TTL seconds.
+    """
+    version = state_cache.get("runner-version", github_token, "actions/runner", RUNNER_VERSION_TTL)
+    if version is None:
+        release = github_session(github_token).request("GET", "/repos/actions/runner/releases/latest")
+        version = release["tag_name"].lstrip("v")
+        state_cache.put("runner-version", github_token, "actions/runner", version)
+    return version
+
+
+def mint_jit_configs(
+    github_token: str,
+    server_name: str,
+    count: int,
+    runner_labels: tuple[str, str] = RUNNER_LABELS,
+    architecture: str = "arm",
+    organisation: str = "armbian",
+) -> list[dict]:
+    """
+    Register count just-in-time runners for a server.
+
+    The runners are named like armbian-config names them
+    (<server_name>-01, -02, ...), so the rest of the script finds them the
+    same way. A leftover runner of the same name (from an earlier server
+    of that name) is removed and the registration retried. If any
+    registration fails, the ones made so far are removed again.
+
+    Returns:
+        [{"id", "name", "config"}], config being the encoded JIT config
+        to start the runner with
+    """
+    session = github_session(github_token)
+    path = f"/orgs/{organisation}/actions/runners/generate-jitconfig"
+    labels = ["self-hosted", "Linux", "ARM64" if architecture == "arm" else "X64", *runner_labels]
+    minted = []
+    try:
+        for i in range(1, count + 1):
+            body = {"name": f"{server_name}-{i:02d}", "runner_group_id": 1, "labels": labels, "work_folder": "_work"}
+            try:
+                response = session.request("POST", path, body)
+            except urllib.error.HTTPError as e:
+                if e.code != 409:
+                    raise
+                for runner in list_org_runners(github_token, organisation):
+                    if runner["name"] == body["name"]:
+                        print(f"[INFO] Removing leftover runner {runner['name']} ({runner['status']})")
+                        session.request("DELETE", f"/orgs/{organisation}/actions/runners/{runner['id']}")
+                response = session.request("POST", path, body)
+            minted.append({"id": response["runner"]["id"], "name": body["name"], "config": response["encoded_jit_config"]})
+    except Exception:
+        remove_jit_runners(github_token, minted, organisation)
+        raise
+    print(f"[DEBUG] Minted {len(minted)} JIT runner config(s) for {server_name}")
+    return minted
+
+
+def remove_jit_runners(github_token: str, runners: list[dict], organisation: str = "armbian") -> None:
+    """Deregister runners from mint_jit_configs() that will not be started."""
+    session = github_session(github_token)
+    for runner in runners:
+        try:
+            session.request("DELETE", f"/orgs/{organisation}/actions/runners/{runner['id']}")
+        except (urllib.error.URLError, OSError) as e:
+            print(f"[WARNING] Could not remove JIT runner {runner['name']}: {e}")
+
 
 def validate_github_token(github_token: str, organisation: str) -> None:
     """
@@ -75,18 +1325,24 @@ def validate_github_token(github_token: str, organisation: str) -> None:
 
     Exits the process non-zero on any failure (unauthorised, missing
     scope, network issue, unknown org). Returns silently on HTTP 200.
+
+    A success is kept in the state cache for TOKEN_VALIDATION_TTL seconds,
+    so the sibling invocations of one fleet operation only check once.
+    Failures are never cached.
     """
-    url = f"https://api.github.com/orgs/{organisation}/actions/runners?per_page=1"
-    req = urllib.request.Request(url)
-    req.add_header("Accept", "application/vnd.github+json")
-    req.add_header("Authorization", f"Bearer {github_token}")
-    req.add_header("X-GitHub-Api-Version", "2022-11-28")
+    if state_cache.get("github-token", github_token, organisation, TOKEN_VALIDATION_TTL):
+        print("[DEBUG] GitHub token already validated by a recent run, skipping the check")
+        return
+
+    url = f"{GITHUB_API}/orgs/{organisation}/actions/runners?per_page=1"
+    req = github_request(github_token, url)
 
     print(f"[DEBUG] Validating GitHub token against {url} ...")
     try:
         with urllib.request.urlopen(req, timeout=15) as resp:
             if resp.status == 200:
                 print("[DEBUG] GitHub token validation OK (HTTP 200)")
+                state_cache.put("github-token", github_token, organisation, True)
                 return
             print(f"[ERROR] GitHub token validation: unexpected HTTP {resp.status}")
     except urllib.error.HTTPError as e:
@@ -108,264 +1364,1847 @@ def validate_github_token(github_token: str, organisation: str) -> None:
     except Exception as e:
         print(f"[ERROR] GitHub token validation: unexpected error ({e})")
 
-    print("")
-    print("  Required scopes:")
-    print("    - Classic PAT:      admin:org (org runners) or repo (repo runners)")
-    print("    - Fine-grained PAT: org 'Self-hosted runners' → Read and write")
-    print("")
-    print("Aborting BEFORE provisioning any Hetzner VM.")
-    sys.exit(1)
+    print("")
+    print("  Required scopes:")
+    print("    - Classic PAT:      admin:org (org runners) or repo (repo runners)")
+    print("    - Fine-grained PAT: org 'Self-hosted runners' → Read and write")
+    print("")
+    print("Aborting BEFORE provisioning any Hetzner VM.")
+    sys.exit(1)
+
+
+# cloud-init parts (see load_cloud_init_part()). packages, docker and
+# armbian-config are what a runner snapshot has pre-installed; swap and
+# runners run on every boot.
+CLOUD_INIT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cloud-init")
+CLOUD_INIT_RUNNER_PARTS = ("packages", "docker", "armbian-config", "swap", "runners", "cleanup")
+CLOUD_INIT_PREBAKED_PARTS = ("swap", "runners")
+CLOUD_INIT_SNAPSHOT_PARTS = ("packages", "docker", "armbian-config", "cleanup", "power-off")
+
+# With --jit the runners are started from configs minted by this script
+# (see mint_jit_configs()) instead of being installed by armbian-config
+CLOUD_INIT_JIT_PARTS = ("packages", "docker", "swap", "jit-runners", "cleanup")
+CLOUD_INIT_JIT_PREBAKED_PARTS = ("swap", "jit-runners")
+
+# Placeholders the parts may use; CLOUD_INIT_SERVER_VARIABLES differ per
+# server, the rest is the same for every server of a type
+CLOUD_INIT_SERVER_VARIABLES = ("github_token", "runner_name", "jit_configs", "runner_version")
+CLOUD_INIT_VARIABLES = (
+    "swap_size", "runner_count", "label_primary", "label_secondary", "organisation", *CLOUD_INIT_SERVER_VARIABLES
+)
+
+# Organisation the runners register with. The GitHub token is validated
+# against the same one in main(); change both together.
+CLOUD_INIT_ORGANISATION = "armbian"
+
+# Swap file size per server type; the small types have the least disk
+SWAP_SIZE_PER_TYPE = {
+    "cax41": "20G",
+    "cax31": "20G",
+    "cax21": "8G",
+    "cax11": "4G",
+}
+DEFAULT_SWAP_SIZE = "20G"
+
+# Hetzner rejects servers whose user_data is larger than this
+USER_DATA_LIMIT = 32 * 1024
+
+# Upper bound of an encoded JIT runner config (base64 JSON with the
+# runner's RSA key, typically about 3 KB); preflight_cloud_init() renders
+# JIT user_data with placeholders of this length
+JIT_CONFIG_SIZE = 4096
+
+# Snapshot images are labelled with this, plus the base image they were
+# built from and their architecture
+SNAPSHOT_LABELS = {"role": "gh-runner-snapshot"}
+SNAPSHOT_BUILDER_LABELS = {"role": "gh-runner-builder"}
+
+# Snapshots can only be used on server types with at least as much disk as
+# the builder, so build on the smallest type of the family
+SNAPSHOT_BUILDER_TYPE = "cax11"
+
+
+@functools.lru_cache(maxsize=None)
+def load_cloud_init_part(name: str) -> tuple[str, string.Template]:
+    """
+    Load and validate a cloud-init part from CLOUD_INIT_DIR/<name>.yml.
+
+    A part is a cloud-config fragment: either top-level keys, or a
+    `runcmd:` list whose items are appended to the other parts' runcmd.
+    Leading comment lines document the part and are not sent. Placeholders
+    are string.Template ones (`${runner_count}`, `$$` for a literal `$`)
+    and must be in CLOUD_INIT_VARIABLES.
+
+    Returns:
+        ("runcmd" or "config", compiled template)
+
+    Raises:
+        ValueError: If the part is malformed or uses an unknown placeholder
+    """
+    path = os.path.join(CLOUD_INIT_DIR, f"{name}.yml")
+    with open(path) as f:
+        lines = f.read().splitlines()
+    while lines and lines[0].startswith("#"):
+        lines.pop(0)
+    if not lines:
+        raise ValueError(f"{path}: empty cloud-init part")
+
+    if lines[0] == "runcmd:":
+        kind, lines = "runcmd", lines[1:]
+        if any(line and not line.startswith("  ") for line in lines):
+            raise ValueError(f"{path}: runcmd parts may only contain runcmd items")
+    elif any(line.startswith("runcmd:") for line in lines):
+        raise ValueError(f"{path}: runcmd must be the only key of a part")
+    else:
+        kind = "config"
+
+    template = string.Template("\n".join(lines) + "\n")
+    for match in template.pattern.finditer(template.template):
+        placeholder = match.group("named") or match.group("braced")
+        if match.group("invalid") is not None or (placeholder and placeholder not in CLOUD_INIT_VARIABLES):
+            raise ValueError(f"{path}: invalid placeholder {match.group()!r}")
+    return kind, template
+
+
+def _fill_template(template: string.Template, values: dict) -> str:
+    """Substitute values, leaving `$$` and all other placeholders as they are."""
+    def replace(match):
+        placeholder = match.group("named") or match.group("braced")
+        if placeholder in values:
+            return str(values[placeholder]).replace("$", "$$")
+        return match.group()
+    return template.pattern.sub(replace, template.template)
+
+
+def compose_cloud_init(parts: tuple[str, ...], final_message: str, **values) -> string.Template:
+    """
+    Join cloud-init parts into one cloud-config document.
+
+    Placeholders in `values` are filled in; the rest (such as the
+    per-server CLOUD_INIT_SERVER_VARIABLES) are left in the returned
+    template.
+    """
+    config, runcmd = [], []
+    for name in parts:
+        kind, template = load_cloud_init_part(name)
+        (runcmd if kind == "runcmd" else config).append(_fill_template(template, values))
+    sections = config + (["runcmd:\n" + "\n".join(runcmd)] if runcmd else [])
+    sections.append(f'final_message: "{final_message}"\n')
+    return string.Template("#cloud-config\n" + "\n".join(sections))
+
+
+@functools.lru_cache(maxsize=None)
+def runner_cloud_init_template(
+    server_type: str,
+    runner_count: int,
+    runner_labels: tuple[str, str] = RUNNER_LABELS,
+    prebaked: bool = False,
+    jit: bool = False,
+) -> string.Template:
+    """
+    Return the cloud-init of a runner server, minus the per-server values.
+
+    Rendered once per (server type, runner count, labels, prebaked, jit);
+    the create fallback loop and every server of a batch reuse it.
+    """
+    label_primary, label_secondary = runner_labels
+    if jit:
+        parts = CLOUD_INIT_JIT_PREBAKED_PARTS if prebaked else CLOUD_INIT_JIT_PARTS
+    else:
+        parts = CLOUD_INIT_PREBAKED_PARTS if prebaked else CLOUD_INIT_RUNNER_PARTS
+    return compose_cloud_init(
+        parts,
+        "Server configuration complete!",
+        swap_size=SWAP_SIZE_PER_TYPE.get(server_type, DEFAULT_SWAP_SIZE),
+        runner_count=runner_count,
+        label_primary=label_primary,
+        label_secondary=label_secondary,
+        organisation=CLOUD_INIT_ORGANISATION,
+    )
+
+
+def get_cloud_init_config(
+    github_token: str,
+    runner_name: str,
+    runner_count: int = 2,
+    prebaked: bool = False,
+    runner_labels: tuple[str, str] = RUNNER_LABELS,
+    server_type: Optional[str] = None,
+    jit_configs: Optional[list[str]] = None,
+    runner_version: Optional[str] = None,
+) -> str:
+    """
+    Generate cloud-init configuration with GitHub token injected.
+
+    With prebaked=True the packages, Docker and armbian-config are assumed
+    to be present already (server booted from a runner snapshot), and only
+    the per-server steps are included. runner_labels are the primary and
+    secondary GitHub labels of the runners; server_type picks the swap size.
+
+    With jit_configs (from mint_jit_configs()) one runner of runner_version
+    is started per config instead, and the token is not included.
+    """
+    template = runner_cloud_init_template(
+        server_type, runner_count, tuple(runner_labels), prebaked, jit=jit_configs is not None
+    )
+    return template.substitute(
+        github_token=github_token,
+        runner_name=runner_name,
+        jit_configs=" ".join(jit_configs or ()),
+        runner_version=runner_version or "",
+    )
+
+
+def check_user_data(user_data: str, name: str) -> int:
+    """
+    Check user_data against Hetzner's USER_DATA_LIMIT before sending it.
+
+    Returns:
+        Size in bytes
+
+    Raises:
+        ValueError: If it is too large
+    """
+    size = len(user_data.encode())
+    print(f"[DEBUG] Cloud-init config for {name}: {size} of {USER_DATA_LIMIT} bytes")
+    if size > USER_DATA_LIMIT:
+        raise ValueError(f"cloud-init config for {name} is {size} bytes, Hetzner allows {USER_DATA_LIMIT}")
+    return size
+
+
+def preflight_cloud_init(github_token: str, server_type: str, runner_count: int) -> None:
+    """
+    Render the largest cloud-init a create could send and check its size.
+
+    Covers every fallback type of server_type and both runner label sets,
+    without a snapshot, with the token and with one placeholder JIT config
+    of JIT_CONFIG_SIZE per runner, so an oversized template fails before
+    any server is created.
+
+    Raises:
+        ValueError: If it is larger than USER_DATA_LIMIT
+    """
+    for try_type in SERVER_TYPE_FALLBACKS.get(server_type, [server_type]):
+        runners = min(runner_count, MAX_RUNNERS_PER_TYPE.get(try_type, 1))
+        for runner_labels in (RUNNER_LABELS, STANDBY_RUNNER_LABELS):
+            for jit_configs in (None, ["x" * JIT_CONFIG_SIZE] * runners):
+                user_data = get_cloud_init_config(
+                    github_token,
+                    f"{POOL_PREFIX}-{DEFAULT_MAX_SERVERS * 100}",
+                    runners,
+                    runner_labels=runner_labels,
+                    server_type=try_type,
+                    jit_configs=jit_configs,
+                    runner_version="2.999.999",
+                )
+                if len(user_data.encode()) > USER_DATA_LIMIT:
+                    check_user_data(user_data, f"{try_type}{' with JIT runners' if jit_configs else ''}")
+
+
+def get_snapshot_cloud_init_config() -> str:
+    """Generate cloud-init configuration for the runner snapshot builder."""
+    return compose_cloud_init(CLOUD_INIT_SNAPSHOT_PARTS, "Snapshot base configuration complete!").substitute()
+
+
+def get_architecture(cache: ResourceCache, server_type: str) -> str:
+    """Return the CPU architecture ("arm" or "x86") of a server type."""
+    bound = cache.server_type(server_type)
+    if bound is not None and bound.architecture:
+        return bound.architecture
+    return "arm" if server_type.startswith("cax") else "x86"
+
+
+def find_runner_snapshot(cache: ResourceCache, image: str, architecture: str):
+    """
+    Return the newest runner snapshot built from `image`, or None.
+
+    Args:
+        cache: Shared resource cache
+        image: Base image name the snapshot was built from
+        architecture: CPU architecture ("arm" or "x86")
+    """
+    candidates = [
+        snapshot for snapshot in cache.snapshots()
+        if snapshot.labels.get("base-image") == image
+        and snapshot.architecture == architecture
+        and snapshot.status == "available"
+    ]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda snapshot: snapshot.created)
+
+
+def build_snapshot(
+    client: Client,
+    image: str,
+    ssh_key_name: str,
+    server_type: str = SNAPSHOT_BUILDER_TYPE,
+    cache: Optional[ResourceCache] = None,
+) -> dict:
+    """
+    Build a runner snapshot with packages, Docker and armbian-config baked in.
+
+    Boots a temporary builder server from `image`, lets cloud-init install
+    everything and power off, snapshots the disk, then deletes the builder
+    and any older snapshot for the same base image and architecture.
+
+    Args:
+        client: Hetzner client
+        image: Base image name (e.g., ubuntu-24.04)
+        ssh_key_name: SSH key name in Hetzner (for debugging the builder)
+        server_type: Builder server type; keep this the smallest of the family
+        cache: Shared resource cache (a private one is used if omitted)
+
+    Returns:
+        Dict with the new snapshot's ID
+    """
+    from hcloud.images import Image
+    from hcloud.server_types import ServerType
+
+    if cache is None:
+        cache = ResourceCache(client)
+
+    name = f"{SERVER_PREFIX}-snapshot-builder"
+    architecture = get_architecture(cache, server_type)
+    labels = {**SNAPSHOT_LABELS, "base-image": image, "architecture": architecture}
+    previous = [
+        snapshot for snapshot in cache.snapshots()
+        if snapshot.labels.get("base-image") == image and snapshot.architecture == architecture
+    ]
+
+    existing = cache.server(name)
+    if existing:
+        print(f"Deleting leftover builder server: {name} (ID: {existing.id})")
+        hcloud_call(hcloud_call(client.servers.delete, existing).wait_until_finished)
+        cache.record_server(existing, deleted=True)
+
+    print(f"Creating snapshot builder {name} ({server_type}, {image})...")
+    ssh_key = cache.ssh_key(ssh_key_name)
+    response = hcloud_call(
+        client.servers.create,
+        idempotent=False,
+        name=name,
+        server_type=cache.server_type(server_type) or ServerType(name=server_type),
+        image=Image(name=image),
+        ssh_keys=[ssh_key] if ssh_key else [],
+        user_data=get_snapshot_cloud_init_config(),
+        labels=dict(SNAPSHOT_BUILDER_LABELS),
+    )
+    builder = response.server
+    try:
+        if response.action:
+            hcloud_call(response.action.wait_until_finished)
+
+        # cloud-init powers the server off when it is done
+        print(f"Waiting for {name} to finish cloud-init and power off...")
+        watcher = ServerStatusWatcher(
+            client,
+            label_selector=",".join(f"{k}={v}" for k, v in SNAPSHOT_BUILDER_LABELS.items()),
+            max_interval=30.0,
+        )
+        with tracer.span("snapshot_build", server=name):
+            server = watcher.wait_for_status(name, STATUS_OFF, timeout=1800)
+        if server is None or server.status != STATUS_OFF:
+            raise Exception(f"Snapshot builder {name} did not power off within 30 minutes")
+
+        print(f"Creating snapshot from {name}...")
+        snapshot = hcloud_call(
+            client.servers.create_image,
+            builder,
+            idempotent=False,
+            description=f"Armbian runner base ({image}, {architecture})",
+            type="snapshot",
+            labels=labels,
+        )
+        with tracer.span("snapshot_image", server=name):
+            hcloud_call(snapshot.action.wait_until_finished, max_retries=600)
+        print(f"[DEBUG] Snapshot created: {snapshot.image.id}")
+    finally:
+        print(f"Deleting snapshot builder {name}...")
+        hcloud_call(client.servers.delete, builder)
+
+    for old in previous:
+        print(f"Deleting previous snapshot {old.id} ({old.description})")
+        hcloud_call(client.images.delete, old)
+    cache.invalidate("snapshots")
+
+    return {
+        "action": "snapshot",
+        "id": snapshot.image.id,
+        "base_image": image,
+        "architecture": architecture,
+        "replaced": [old.id for old in previous],
+    }
+
+
+def available_locations(cache: ResourceCache, server_type: str) -> Optional[list[str]]:
+    """
+    Return the locations where server_type can currently be ordered.
+
+    Returns:
+        Location names in API order, or None if the API reported no
+        per-location availability for the type
+    """
+    bound = cache.server_type(server_type)
+    if bound is None or not getattr(bound, "locations", None):
+        return None
+    return [entry.location.name for entry in bound.locations if entry.available]
+
+
+def plan_placement(
+    cache: ResourceCache,
+    server_type: str,
+    runner_count: int = 2,
+    server_count: Optional[int] = None,
+    target_runners: Optional[int] = None,
+    locations: Optional[list[str]] = None,
+) -> list[dict]:
+    """
+    Choose a server type and location for every server to be created.
+
+    Availability of each type in SERVER_TYPE_FALLBACKS[server_type] is read
+    once from the (cached) server type listing, instead of discovering it
+    through failed create attempts in a single location. The largest type
+    that is available anywhere is used, spread round-robin over the
+    locations that have it. With target_runners the number of servers is
+    chosen to reach that many runners with as few VMs as possible; the last
+    server uses the smallest available type that still covers the rest.
+
+    Args:
+        cache: Shared resource cache
+        server_type: Largest server type wanted (e.g., cax41)
+        runner_count: Runners wanted per server
+        server_count: Number of servers (ignored with target_runners)
+        target_runners: Total number of runners wanted across the fleet
+        locations: Allowed locations in order of preference (default: any)
+
+    Returns:
+        One dict per server with "server_type", "location" (None if
+        unknown) and "runners"
+    """
+    candidates = SERVER_TYPE_FALLBACKS.get(server_type, [server_type])
+
+    def capacity(try_type: str) -> int:
+        return min(runner_count, MAX_RUNNERS_PER_TYPE.get(try_type, 1))
+
+    # type -> locations it can be placed in, in order of preference
+    usable = {}
+    for try_type in candidates:
+        found = available_locations(cache, try_type)
+        if found is None:
+            # No availability information; let the create fallback decide,
+            # but only among the allowed locations
+            usable[try_type] = locations or [None]
+            continue
+        if locations:
+            found = [loc for loc in locations if loc in found]
+        if found:
+            usable[try_type] = found
+
+    if not usable:
+        print(f"[WARNING] None of {candidates} is available in {locations or 'any location'}")
+        usable = {candidates[0]: locations or [None]}
+
+    best = next(t for t in candidates if t in usable)
+    if target_runners is not None:
+        server_count = -(-target_runners // capacity(best))
+    server_count = server_count or 0
+
+    plan = []
+    for i in range(server_count):
+        try_type = best
+        if target_runners is not None and i == server_count - 1:
+            remaining = target_runners - capacity(best) * i
+            fitting = [t for t in candidates if t in usable and capacity(t) >= remaining]
+            try_type = fitting[-1] if fitting else best
+        type_locations = usable[try_type]
+        plan.append({
+            "server_type": try_type,
+            "location": type_locations[i % len(type_locations)],
+            "runners": capacity(try_type),
+        })
+
+    summary = ", ".join(f"{p['server_type']}@{p['location'] or 'any'}" for p in plan)
+    print(f"[INFO] Placement plan ({sum(p['runners'] for p in plan)} runners): {summary}")
+    return plan
+
+
+def start_server_creation(
+    client: Client,
+    name: str,
+    server_type: str,
+    image: str,
+    ssh_key_name: str,
+    github_token: str,
+    delete_existing: bool = False,
+    runner_count: int = 2,
+    cache: Optional[ResourceCache] = None,
+    use_snapshot: bool = True,
+    location: Optional[str] = None,
+    labels: Optional[dict] = None,
+    runner_labels: tuple[str, str] = RUNNER_LABELS,
+    jit: bool = False,
+    resume: Optional[dict] = None,
+) -> dict:
+    """
+    Issue the create request for a single Hetzner server without waiting for it.
+
+    Handles the existing-server check and the server type fallback loop.
+    The returned dict is either a final result (status "exists") or a
+    pending entry to be passed to finish_server_creation().
+
+    Args:
+        client: Hetzner client
+        name: Server name
+        server_type: Server type (e.g., cax21, cax31)
+        image: Image name (e.g., ubuntu-22.04)
+        ssh_key_name: SSH key name in Hetzner
+        delete_existing: Delete existing server if present
+        runner_count: Number of runners to install
+        cache: Shared resource cache (a private one is used if omitted)
+        use_snapshot: Boot from the runner snapshot for `image` if one exists
+        location: Hetzner location (e.g., fsn1); Hetzner picks one if omitted
+        labels: Hetzner labels to set in addition to SERVER_LABELS
+        runner_labels: GitHub labels (primary, secondary) of the runners
+        jit: Register the runners here (see mint_jit_configs()) and start
+            them from their JIT configs, instead of passing the token on
+        resume: The journal's last attempt at this server (see
+            Journal.servers()). If it created the existing server, that is
+            finished where the attempt stopped instead of being reported
+            as existing
+
+    Returns:
+        Dict with server info (status "exists") or pending creation state
+    """
+    print(f"[DEBUG] Starting server creation for: {name}")
+    print(f"[DEBUG] Server type: {server_type}, Image: {image}")
+    print(f"[DEBUG] SSH key name: {ssh_key_name}")
+    print(f"[DEBUG] Delete existing: {delete_existing}")
+    print(f"[DEBUG] Runner count: {runner_count}")
+    print(f"[DEBUG] Location: {location or 'any'}")
+
+    from hcloud._exceptions import APIException
+    from hcloud.images import Image
+    from hcloud.locations import Location
+    from hcloud.server_types import ServerType
+
+    if cache is None:
+        cache = ResourceCache(client)
+
+    # Check if server exists
+    existing = cache.server(name)
+    if existing and resume and resume["id"] in (existing.id, None):
+        # An ID of None: the run stopped between the create request and
+        # journaling its result
+        if "done" in resume["steps"]:
+            print(f"[INFO] {name} (ID: {existing.id}) was completely provisioned by an earlier run")
+            return {
+                "name": name,
+                "status": "exists",
+                "id": existing.id,
+                "public_ip": existing.public_net.ipv4.ip if existing.public_net else None,
+                "resumed": "done",
+            }
+        print(f"[INFO] Resuming {name} (ID: {existing.id}), earlier run got to: {', '.join(sorted(resume['steps']))}")
+        actual_type = existing.server_type.name
+        return {
+            "name": name,
+            "status": "pending",
+            "response": SimpleNamespace(server=existing, action=None),
+            "requested_type": server_type,
+            "actual_type": actual_type,
+            "requested_runners": runner_count,
+            "actual_runners": resume.get("runners", min(runner_count, MAX_RUNNERS_PER_TYPE.get(actual_type, 1))),
+            "snapshot_id": resume.get("snapshot_id"),
+            "location": resume.get("location", location),
+            "created_at": resume.get("created_at", time.time()),
+            "resumed": sorted(resume["steps"]),
+        }
+    if existing:
+        print(f"[DEBUG] Server {name} already exists (ID: {existing.id}, Status: {existing.status})")
+        if delete_existing:
+            print(f"Deleting existing server: {name}")
+            hcloud_call(hcloud_call(client.servers.delete, existing).wait_until_finished)
+            cache.record_server(existing, deleted=True)
+            print(f"[DEBUG] Existing server deleted")
+        else:
+            print(f"[DEBUG] Returning existing server info")
+            return {
+                "name": name,
+                "status": "exists",
+                "id": existing.id,
+                "public_ip": existing.public_net.ipv4.ip if existing.public_net else None,
+            }
+
+    # Get SSH key
+    print(f"[DEBUG] Looking up SSH key '{ssh_key_name}'...")
+    with tracer.span("ssh_key_lookup", server=name, ssh_key=ssh_key_name) as span:
+        ssh_key = cache.ssh_key(ssh_key_name)
+        span["found"] = ssh_key is not None
+
+    if not ssh_key:
+        print(f"Warning: SSH key '{ssh_key_name}' not found, creating without SSH key")
+    else:
+        print(f"[DEBUG] Using SSH key: {ssh_key.name}")
+
+    # Prefer the pre-baked runner snapshot; fall back to the full cloud-init
+    # path on the plain image if there is none
+    snapshot = None
+    if use_snapshot:
+        snapshot = find_runner_snapshot(cache, image, get_architecture(cache, server_type))
+        if snapshot:
+            print(f"[DEBUG] Booting from runner snapshot {snapshot.id} ({snapshot.description})")
+        else:
+            print(f"[INFO] No runner snapshot for {image}, using full cloud-init")
+    boot_image = Image(id=snapshot.id) if snapshot else Image(name=image)
+
+    # Get fallback server types
+    fallback_types = SERVER_TYPE_FALLBACKS.get(server_type, [server_type])
+    print(f"[DEBUG] Will try server types in order: {fallback_types}")
+
+    # Store original requested runner count
+    requested_runner_count = runner_count
+
+    # Try creating server with fallback to smaller types
+    response = None
+    actual_server_type = None
+    actual_runner_count = None
+
+    journal.record(name, "intent", server_type=server_type, runners=runner_count, location=location)
+
+    # JIT runners registered for this server; deregistered again if it is
+    # not created after all
+    minted = []
+    runner_version = latest_runner_version(github_token) if jit else None
+
+    try:
+        for i, try_type in enumerate(fallback_types):
+            print(f"Attempting to create server {name} with type {try_type} (attempt {i+1}/{len(fallback_types)})...")
+
+            # Adjust runner count based on server type
+            max_runners = MAX_RUNNERS_PER_TYPE.get(try_type, 1)
+            actual_runner_count = min(requested_runner_count, max_runners)
+
+            if try_type != server_type:
+                print(f"[INFO] Adjusted runner count from {requested_runner_count} to {actual_runner_count} for {try_type}")
+
+            if jit:
+                # Fallback types only get smaller, so mint once and drop the
+                # registrations a smaller type has no room for
+                if not minted:
+                    with tracer.span("mint_jit_configs", server=name, runners=actual_runner_count):
+                        minted = mint_jit_configs(
+                            github_token, name, actual_runner_count, runner_labels, get_architecture(cache, try_type)
+                        )
+                elif len(minted) > actual_runner_count:
+                    remove_jit_runners(github_token, minted[actual_runner_count:])
+                    minted = minted[:actual_runner_count]
+
+            # Generate cloud-init config with adjusted runner count
+            print(f"[DEBUG] Generating cloud-init config with {actual_runner_count} runner(s)...")
+            user_data = get_cloud_init_config(
+                github_token,
+                name,
+                actual_runner_count,
+                prebaked=snapshot is not None,
+                runner_labels=runner_labels,
+                server_type=try_type,
+                jit_configs=[runner["config"] for runner in minted] if jit else None,
+                runner_version=runner_version,
+            )
+            check_user_data(user_data, name)
+
+            try:
+                created_at = time.time()
+                with tracer.span("create_attempt", server=name, server_type=try_type, location=location):
+                    response = hcloud_call(
+                        client.servers.create,
+                        idempotent=False,
+                        name=name,
+                        server_type=cache.server_type(try_type) or ServerType(name=try_type),
+                        image=boot_image,
+                        ssh_keys=[ssh_key] if ssh_key else [],
+                        user_data=user_data,
+                        labels={**SERVER_LABELS, **(labels or {})},
+                        location=Location(name=location) if location else None,
+                    )
+                actual_server_type = try_type
+                cache.record_server(response.server)
+                print(f"[DEBUG] Server creation initiated with type {try_type}")
+                break
+            except APIException as e:
+                error_str = str(e).lower()
+                if is_retryable(e):
+                    # Retries exhausted on a transient error; a smaller type won't help
+                    print(f"[ERROR] Server creation failed after retries: {e}")
+                    raise
+                if "resource_unavailable" in error_str or "placement" in error_str or "unavailable" in error_str:
+                    print(f"[WARNING] Server type {try_type} unavailable: {e}")
+                    if i < len(fallback_types) - 1:
+                        print(f"[INFO] Retrying with smaller server type...")
+                        continue
+                    else:
+                        print(f"[ERROR] All server types exhausted. Last error: {e}")
+                        raise
+                else:
+                    # Not a placement error, re-raise immediately
+                    print(f"[ERROR] Server creation failed with non-placement error: {e}")
+                    raise
+            except Exception as e:
+                print(f"[ERROR] Server creation failed: {e}")
+                raise
+    except Exception:
+        if minted:
+            remove_jit_runners(github_token, minted)
+        raise
+
+    if not response or not actual_server_type:
+        print(f"[ERROR] Failed to create server after trying all types")
+        raise Exception("Server creation failed: all types exhausted")
+
+    journal.record(
+        name, "created", response.server.id, server_type=actual_server_type, runners=actual_runner_count,
+        location=location, snapshot_id=snapshot.id if snapshot else None, created_at=created_at,
+    )
+    milestones.emit(
+        "created", name, id=response.server.id, server_type=actual_server_type, location=location,
+        runners=actual_runner_count,
+    )
+
+    return {
+        "name": name,
+        "status": "pending",
+        "response": response,
+        "requested_type": server_type,
+        "actual_type": actual_server_type,
+        "requested_runners": requested_runner_count,
+        "actual_runners": actual_runner_count,
+        "snapshot_id": snapshot.id if snapshot else None,
+        "location": location,
+        "created_at": created_at,
+    }
+
+
+def finish_server_creation(
+    client: Client,
+    pending: dict,
+    watcher: Optional[ServerStatusWatcher] = None,
+    runner_watcher: Optional[RunnerStatusWatcher] = None,
+    runner_timeout: float = DEFAULT_RUNNER_TIMEOUT,
+    action_watcher: Optional[ActionStatusWatcher] = None,
+) -> dict:
+    """
+    Wait for a server issued by start_server_creation() to be running.
+
+    With a runner_watcher, additionally wait for the server's runners to
+    come online at GitHub. The result records how long each stage took
+    after the create request.
+
+    Args:
+        client: Hetzner client
+        pending: Pending creation state from start_server_creation()
+        watcher: Shared status watcher (a private one is used if omitted)
+        runner_watcher: Shared GitHub runner watcher (skip the wait if omitted)
+        runner_timeout: Maximum time to wait for runners in seconds
+        action_watcher: Shared create action watcher (the action is
+            polled on its own if omitted)
+
+    Returns:
+        Dict with server info
+    """
+    if pending["status"] != "pending":
+        return pending
+
+    name = pending["name"]
+    response = pending["response"]
+    server_type = pending["requested_type"]
+    actual_server_type = pending["actual_type"]
+    requested_runner_count = pending["requested_runners"]
+    actual_runner_count = pending["actual_runners"]
+
+    if watcher is None:
+        watcher = ServerStatusWatcher(client)
+
+    # Wait for server creation to complete
+    if response.action:
+        print(f"[DEBUG] Waiting for server creation action to complete...")
+        with tracer.span("action_wait", server=name, action=response.action.id):
+            if action_watcher is None:
+                hcloud_call(response.action.wait_until_finished)
+            else:
+                status = action_watcher.wait_for_action(response.action.id)
+                if status == "error":
+                    raise HetznerAPIError("action_failed", f"Create action {response.action.id} of {name} failed")
+                if status != "success":
+                    print(f"[WARNING] Create action {response.action.id} of {name} is still {status}")
+        print(f"[DEBUG] Server creation action completed")
+
+    # Wait for server to be running
+    print(f"Waiting for {name} to be running...")
+    with tracer.span("wait_running", server=name) as span:
+        server = watcher.wait_for_status(name, STATUS_RUNNING, timeout=300)
+        span["status"] = server.status if server else None
+    if server is None:
+        # Not visible through the label filter; fall back to a direct lookup
+        server = hcloud_call(client.servers.get_by_name, name)
+    print(f"[DEBUG] Server retrieved: {server.name} (ID: {server.id})")
+    time_to_running = None
+    if server.status == STATUS_RUNNING:
+        # Dated by the poll that first showed it, not by when this waiter woke up
+        running_at = watcher.status_since(name, STATUS_RUNNING) or time.time()
+        time_to_running = round(running_at - pending["created_at"], 1)
+        print(f"[DEBUG] Server is running!")
+        journal.record(name, "running", server.id)
+        milestones.emit(
+            "running", name, ready=runner_watcher is None, id=server.id,
+            public_ip=server.public_net.ipv4.ip if server.public_net else None, time_to_running=time_to_running,
+        )
+    else:
+        print(f"[WARNING] Server did not reach RUNNING status after 5 minutes")
+        print(f"[DEBUG] Final status: {server.status}")
+
+    result = {
+        "name": name,
+        "status": server.status,
+        "id": server.id,
+        "public_ip": server.public_net.ipv4.ip if server.public_net else None,
+        "server_type": server.server_type.name,
+        "image": server.image.name if server.image else None,
+        "location": pending["location"],
+        "requested_type": server_type,
+        "requested_runners": requested_runner_count,
+        "actual_runners": actual_runner_count,
+        "snapshot_id": pending["snapshot_id"],
+        "time_to_running": time_to_running,
+    }
+
+    if runner_watcher is not None and time_to_running is not None:
+        print(f"Waiting for {actual_runner_count} runner(s) of {name} to come online...")
+        with tracer.span("wait_runners", server=name, expected=actual_runner_count) as span:
+            online = runner_watcher.wait_for_runners(name, actual_runner_count, timeout=runner_timeout)
+            span["online"] = len(online)
+        result["runners_online"] = len(online)
+        result["runners_ready"] = len(online) >= actual_runner_count
+        result["time_to_runners_online"] = None
+        if result["runners_ready"]:
+            online_at = runner_watcher.online_since(online) or time.time()
+            result["time_to_runners_online"] = round(online_at - pending["created_at"], 1)
+            journal.record(name, "runners_online", server.id)
+            milestones.emit(
+                "runners_online", name, ready=True, runners=len(online),
+                time_to_runners_online=result["time_to_runners_online"],
+            )
+        else:
+            print(f"[WARNING] Only {len(online)}/{actual_runner_count} runner(s) of {name} online after {runner_timeout}s")
+        print(
+            f"[METRIC] {name}: time_to_running={time_to_running}s "
+            f"time_to_runners_online={result['time_to_runners_online']}s"
+        )
+
+    # Warn if we had to fall back to a smaller type or fewer runners
+    if actual_server_type != server_type:
+        print(f"[WARNING] Requested {server_type} but created {actual_server_type} due to capacity constraints")
+    if actual_runner_count != requested_runner_count:
+        print(f"[WARNING] Requested {requested_runner_count} runners but configured {actual_runner_count} for {actual_server_type}")
+
+    if pending.get("resumed"):
+        result["resumed"] = pending["resumed"]
+    if time_to_running is not None and result.get("runners_ready") is not False:
+        journal.record(name, "done", server.id)
+
+    print(f"[DEBUG] Server creation result: {result}")
+    return result
+
+
+def create_server(
+    client: Client,
+    name: str,
+    server_type: str,
+    image: str,
+    ssh_key_name: str,
+    github_token: str,
+    delete_existing: bool = False,
+    runner_count: int = 2,
+    cache: Optional[ResourceCache] = None,
+    use_snapshot: bool = True,
+) -> dict:
+    """
+    Create a single Hetzner server and wait for it to be running.
+
+    Args:
+        client: Hetzner client
+        name: Server name
+        server_type: Server type (e.g., cax21, cax31)
+        image: Image name (e.g., ubuntu-22.04)
+        ssh_key_name: SSH key name in Hetzner
+        delete_existing: Delete existing server if present
+        runner_count: Number of runners to install
+        cache: Shared resource cache (a private one is used if omitted)
+        use_snapshot: Boot from the runner snapshot for `image` if one exists
+
+    Returns:
+        Dict with server info
+    """
+    pending = start_server_creation(
+        client,
+        name=name,
+        server_type=server_type,
+        image=image,
+        ssh_key_name=ssh_key_name,
+        github_token=github_token,
+        delete_existing=delete_existing,
+        runner_count=runner_count,
+        cache=cache,
+        use_snapshot=use_snapshot,
+    )
+    return finish_server_creation(client, pending)
+
+
+def create_servers(
+    client: Client,
+    server_names: list[str],
+    server_type: str,
+    image: str,
+    ssh_key_name: str,
+    github_token: str,
+    delete_existing: bool = False,
+    runner_count: int = 2,
+    parallelism: int = DEFAULT_PARALLELISM,
+    cache: Optional[ResourceCache] = None,
+    use_snapshot: bool = True,
+    wait_for_runners: bool = False,
+    runner_timeout: float = DEFAULT_RUNNER_TIMEOUT,
+    placement: Optional[list[dict]] = None,
+    locations: Optional[list[str]] = None,
+    labels: Optional[dict] = None,
+    runner_labels: tuple[str, str] = RUNNER_LABELS,
+    jit: bool = False,
+    resume: bool = False,
+) -> list[dict]:
+    """
+    Create a fleet of servers concurrently.
+
+    All create requests are issued up front (at most `parallelism` API
+    calls in flight), then every server is waited on together, each in
+    its own thread. The waits share one poller per kind of state (see
+    SharedPoller), so they add no API calls of their own. A failure
+    on one server is reported in its result entry and does not abort the
+    others.
+
+    Args:
+        client: Hetzner client
+        server_names: Names of the servers to create
+        server_type: Server type (e.g., cax21, cax31)
+        image: Image name (e.g., ubuntu-22.04)
+        ssh_key_name: SSH key name in Hetzner
+        github_token: GitHub token for runner registration
+        delete_existing: Delete existing servers if present
+        runner_count: Number of runners to install per server
+        parallelism: Maximum number of concurrent create requests
+        cache: Shared resource cache (a private one is used if omitted)
+        use_snapshot: Boot from the runner snapshot for `image` if one exists
+        wait_for_runners: Also wait for each server's runners to be online
+        runner_timeout: Maximum time to wait for runners in seconds
+        placement: Per-server plan from plan_placement() (planned here if omitted)
+        locations: Allowed locations in order of preference (default: any)
+        labels: Hetzner labels to set in addition to SERVER_LABELS
+        runner_labels: GitHub labels (primary, secondary) of the runners
+        jit: Start the runners from JIT configs minted here (see
+            start_server_creation())
+        resume: Finish servers an earlier run left incomplete, going by the
+            journal, instead of reporting them as existing
+
+    Returns:
+        List of per-server result dicts, in the order of server_names
+    """
+    parallelism = max(1, min(parallelism, len(server_names) or 1))
+    print(f"[DEBUG] Creating {len(server_names)} server(s) with parallelism {parallelism}")
+
+    results: dict[str, dict] = {}
+    watcher = ServerStatusWatcher(client)
+    action_watcher = ActionStatusWatcher(client)
+    runner_watcher = RunnerStatusWatcher(github_token, organisation="armbian") if wait_for_runners else None
+    if cache is None:
+        cache = ResourceCache(client)
+
+    # Warm the listings every worker needs, so they are fetched once
+    # instead of racing to fetch them in parallel
+    cache.servers()
+    cache.ssh_keys()
+    cache.server_types()
+    if use_snapshot:
+        cache.snapshots()
+
+    attempts = journal.servers() if resume else {}
+
+    if placement is None:
+        placement = plan_placement(
+            cache, server_type, runner_count, server_count=len(server_names), locations=locations
+        )
+
+    def _failed(name: str, error: Exception) -> dict:
+        print(f"[ERROR] Server {name} failed: {error}")
+        milestones.emit("failed", name, error=str(error))
+        return {"name": name, "status": "error", "error": str(error)}
+
+    with ThreadPoolExecutor(max_workers=parallelism) as pool:
+        # Phase 1: issue every create request
+        futures = {
+            pool.submit(
+                start_server_creation,
+                client,
+                name=name,
+                server_type=planned["server_type"],
+                image=image,
+                ssh_key_name=ssh_key_name,
+                github_token=github_token,
+                delete_existing=delete_existing,
+                runner_count=runner_count,
+                cache=cache,
+                use_snapshot=use_snapshot,
+                location=planned["location"],
+                labels=labels,
+                runner_labels=runner_labels,
+                jit=jit,
+                resume=attempts.get(name),
+            ): name
+            for name, planned in zip(server_names, placement)
+        }
+        pending = []
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                pending.append(future.result())
+            except Exception as e:
+                results[name] = _failed(name, e)
+    watcher.kick()
+
+    # Phase 2: wait for all issued servers together; only the shared
+    # watchers call the APIs, so every server gets its own waiter
+    with ThreadPoolExecutor(max_workers=max(1, len(pending))) as pool:
+        futures = {
+            pool.submit(
+                finish_server_creation, client, entry, watcher, runner_watcher, runner_timeout, action_watcher
+            ): entry["name"]
+            for entry in pending
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                results[name] = _failed(name, e)
+
+    return [results[name] for name in server_names]
+
+
+def wait_for_actions(
+    client: Client,
+    actions: list,
+    timeout: float = 300,
+    interval: float = 1.0,
+) -> dict:
+    """
+    Wait for many Hetzner actions with one batched status request per tick.
+
+    Uses GET /actions?id=...&id=... (50 IDs per request) instead of
+    reloading every action on its own.
+
+    Args:
+        client: Hetzner client
+        actions: Actions to wait for
+        timeout: Maximum time to wait in seconds
+        interval: Seconds between polls
+
+    Returns:
+        Dict mapping action ID to its final status ("success", "error",
+        or "running" if it did not finish in time)
+    """
+    pending = {action.id for action in actions}
+    statuses = {}
+    deadline = time.time() + timeout
+    while pending:
+        ids = sorted(pending)
+        for i in range(0, len(ids), 50):
+            response = hcloud_call(
+                client.request,
+                "GET", "/actions", params={"id": ids[i:i + 50], "per_page": 50}
+            )
+            for action in response.get("actions", []):
+                if action["status"] != "running":
+                    statuses[action["id"]] = action["status"]
+                    pending.discard(action["id"])
+        if not pending or time.time() >= deadline:
+            break
+        time.sleep(interval)
+
+    for action_id in pending:
+        statuses[action_id] = "running"
+    return statuses
+
+
+def remove_org_runners(github_token: str, organisation: str, server_names: list[str]) -> int:
+    """
+    Deregister the GitHub runners of deleted servers.
+
+    Runners of a deleted VM linger at GitHub (first online, then offline)
+    until removed. One runner listing covers every server; busy runners
+    are left alone.
+
+    Returns:
+        Number of runners removed
+    """
+    try:
+        runners = list_org_runners(github_token, organisation, max_age=RUNNER_LIST_TTL)
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        print(f"[WARNING] Could not list runners to deregister: {e}")
+        return 0
+    removed = 0
+    for name in server_names:
+        for runner in runners_of_server(runners, name):
+            if runner.get("busy"):
+                print(f"[WARNING] Runner {runner['name']} is busy, not removing it")
+                continue
+            url = f"{GITHUB_API}/orgs/{organisation}/actions/runners/{runner['id']}"
+            try:
+                urllib.request.urlopen(github_request(github_token, url, method="DELETE"), timeout=15).close()
+                print(f"Removed runner {runner['name']} ({runner['status']})")
+                removed += 1
+            except urllib.error.HTTPError as e:
+                if e.code == 404:
+                    # Removed by a sibling since the (cached) listing
+                    continue
+                print(f"[WARNING] Could not remove runner {runner['name']}: HTTP {e.code}")
+            except (urllib.error.URLError, OSError) as e:
+                # The servers are gone already; a stale runner is only cosmetic
+                print(f"[WARNING] Could not remove runner {runner['name']}: {e}")
+    return removed
+
+
+def delete_servers(
+    client: Client,
+    server_names: list[str],
+    cache: Optional[ResourceCache] = None,
+    wait: bool = True,
+    github_token: Optional[str] = None,
+    organisation: str = "armbian",
+    parallelism: int = DEFAULT_PARALLELISM,
+) -> dict:
+    """
+    Delete servers by name.
+
+    All delete requests are fired in parallel and, with wait=True, tracked
+    to completion with batched action polls, so the names are verifiably
+    free when this returns. With a github_token the servers' runners are
+    deregistered at GitHub afterwards.
+
+    Args:
+        client: Hetzner client
+        server_names: List of server names to delete
+        cache: Shared resource cache (a private one is used if omitted)
+        wait: Wait for the delete actions to finish
+        github_token: GitHub token to deregister the servers' runners
+        organisation: GitHub organisation the runners are registered at
+        parallelism: Maximum number of concurrent delete requests
+
+    Returns:
+        Dict with deletion results
+    """
+    if cache is None:
+        cache = ResourceCache(client)
+
+    results = {}
+    targets = []
+    for name in server_names:
+        server = cache.server(name)
+        if server:
+            targets.append(server)
+        else:
+            results[name] = {"name": name, "status": "not_found"}
+
+    def _delete(server):
+        print(f"Deleting server: {server.name} (ID: {server.id})")
+        with tracer.span("delete", server=server.name):
+            action = hcloud_call(client.servers.delete, server)
+        cache.record_server(server, deleted=True)
+        return action
+
+    actions = {}
+    if targets:
+        with ThreadPoolExecutor(max_workers=max(1, min(parallelism, len(targets)))) as pool:
+            futures = {pool.submit(_delete, server): server for server in targets}
+            for future in as_completed(futures):
+                server = futures[future]
+                try:
+                    actions[server.name] = future.result()
+                    results[server.name] = {"name": server.name, "status": "deleted", "id": server.id}
+                except Exception as e:
+                    print(f"[ERROR] Deleting {server.name} failed: {e}")
+                    results[server.name] = {"name": server.name, "status": "error", "id": server.id, "error": str(e)}
+
+    if wait and actions:
+        print(f"[DEBUG] Waiting for {len(actions)} delete action(s) to finish...")
+        with tracer.span("delete_wait", servers=len(actions)):
+            statuses = wait_for_actions(client, list(actions.values()))
+        for name, action in actions.items():
+            status = statuses.get(action.id)
+            if status != "success":
+                print(f"[ERROR] Delete of {name} did not finish: action {action.id} is {status}")
+                results[name]["status"] = "error"
+                results[name]["error"] = f"delete action {status}"
+
+    result = {
+        "deleted": len([r for r in results.values() if r["status"] == "deleted"]),
+        "servers": [results[name] for name in server_names],
+    }
+
+    if github_token and actions:
+        result["runners_removed"] = remove_org_runners(
+            github_token, organisation, [name for name in actions if results[name]["status"] == "deleted"]
+        )
+
+    return result
+
+
+def indexed_servers(servers: list, prefix: str = SERVER_PREFIX) -> dict[int, object]:
+    """Return the servers named <prefix>-<n>, by n."""
+    pattern = re.compile(rf"^{re.escape(prefix)}-(\d+)$")
+    indexed = {}
+    for server in servers:
+        match = pattern.match(server.name)
+        if match:
+            indexed[int(match.group(1))] = server
+    return indexed
+
+
+# Server states that reconcile treats as broken and replaces
+UNHEALTHY_STATUSES = (STATUS_OFF, STATUS_UNKNOWN)
+
+
+def plan_fleet(servers: list, count: int, runners: Optional[list[dict]] = None) -> dict:
+    """
+    Compute the minimal change from the existing runner servers to a fleet
+    of `count` servers named hetzner-runner-0 .. hetzner-runner-<count-1>.
+
+    Healthy servers inside the range are kept as they are, whatever their
+    type. Servers outside the range are deleted (scale down removes the
+    highest indexes), unless one of their runners is busy: those are
+    deferred to a later run, so no running job loses its VM. Servers
+    inside the range in an unhealthy state are deleted and created again.
+
+    Args:
+        servers: Server objects of the project (other servers are ignored)
+        count: Desired number of servers
+        runners: The org's runners (see list_org_runners()); without them
+            no server is deferred
 
+    Returns:
+        Dict with the server names to keep, create, delete and defer
+    """
+    existing = indexed_servers(servers)
+
+    keep, create, delete, deferred = [], [], [], []
+    for index in range(count):
+        server = existing.get(index)
+        name = f"{SERVER_PREFIX}-{index}"
+        if server is None:
+            create.append(name)
+        elif server.status in UNHEALTHY_STATUSES:
+            print(f"[INFO] {name} is {server.status}, replacing it")
+            delete.append(name)
+            create.append(name)
+        else:
+            keep.append(name)
+    for index in sorted(existing):
+        if index < count:
+            continue
+        name = existing[index].name
+        if any(runner.get("busy") for runner in runners_of_server(runners or [], name)):
+            print(f"[INFO] {name} is running a job, deferring its deletion")
+            deferred.append(name)
+        else:
+            delete.append(name)
 
-def get_cloud_init_config(github_token: str, runner_name: str, runner_count: int = 2) -> str:
-    """Generate cloud-init configuration with GitHub token injected."""
-    return f"""#cloud-config
-package_update: true
-package_upgrade: true
-packages:
-  - curl
-  - tree
-  - git
-  - ca-certificates
-
-runcmd:
-  # Install Docker
-  - curl -fsSL https://get.docker.com -o get-docker.sh
-  - sh get-docker.sh
-  - usermod -aG docker root
-
-  # Add Armbian GPG key
-  - curl -fsSL https://apt.armbian.com/armbian.key | gpg --dearmor -o /usr/share/keyrings/armbian.gpg
-
-  # Add Armbian config repository
-  - |
-    cat << EOF | tee /etc/apt/sources.list.d/armbian-config.sources > /dev/null
-    Types: deb
-    URIs: https://github.armbian.com/configng
-    Suites: stable
-    Components: main
-    Signed-By: /usr/share/keyrings/armbian.gpg
-    EOF
-
-  # Update package list and install armbian-config
-  - apt-get update
-  - apt-get install -y armbian-config
-
-  # Create 20GB swap file
-  - fallocate -l 20G /swapfile
-  - chmod 600 /swapfile
-  - mkswap /swapfile
-  - swapon /swapfile
-  - echo '/swapfile none swap sw 0 0' >> /etc/fstab
-
-  # Install GitHub Actions runners (start=1 stop={runner_count} installs {runner_count} runners)
-  - armbian-config --api module_armbian_runners install gh_token={github_token} runner_name={runner_name} start=1 stop={runner_count} label_primary=alfa label_secondary=images organisation=armbian
-
-  # Clean up
-  - rm -f get-docker.sh
-
-final_message: "Server configuration complete!"
-"""
+    return {"keep": keep, "create": create, "delete": delete, "deferred": deferred}
 
 
-def create_server(
+def reconcile_fleet(
     client: Client,
-    name: str,
+    count: int,
     server_type: str,
     image: str,
     ssh_key_name: str,
     github_token: str,
-    delete_existing: bool = False,
     runner_count: int = 2,
+    parallelism: int = DEFAULT_PARALLELISM,
+    use_snapshot: bool = True,
+    wait_for_runners: bool = False,
+    runner_timeout: float = DEFAULT_RUNNER_TIMEOUT,
+    dry_run: bool = False,
+    locations: Optional[list[str]] = None,
+    jit: bool = False,
 ) -> dict:
     """
-    Create a single Hetzner server.
+    Bring the runner fleet to `count` servers with as few changes as possible.
+
+    Lists the project's servers once (and, when scaling down, the org's
+    runners once), computes the diff with plan_fleet() and applies it.
+    Servers to remove whose runners are busy are left for a later run.
+    Deletes go first (waiting for them, so a replaced server's
+    name is free again), then all creates concurrently. The type and runner
+    count only apply to servers that get created.
 
     Args:
         client: Hetzner client
-        name: Server name
-        server_type: Server type (e.g., cax21, cax31)
-        image: Image name (e.g., ubuntu-22.04)
+        count: Desired number of servers
+        server_type: Server type for new servers
+        image: Image name for new servers
         ssh_key_name: SSH key name in Hetzner
-        delete_existing: Delete existing server if present
-        runner_count: Number of runners to install
+        github_token: GitHub token for runner registration
+        runner_count: Number of runners per new server
+        parallelism: Maximum number of concurrent workers
+        use_snapshot: Boot from the runner snapshot for `image` if one exists
+        wait_for_runners: Also wait for each new server's runners to be online
+        runner_timeout: Maximum time to wait for runners in seconds
+        dry_run: Only compute and report the plan
+        locations: Allowed locations in order of preference (default: any)
+        jit: Start the new servers' runners from JIT configs
 
     Returns:
-        Dict with server info
+        Dict with the plan and the results of the creates
     """
-    print(f"[DEBUG] Starting server creation for: {name}")
-    print(f"[DEBUG] Server type: {server_type}, Image: {image}")
-    print(f"[DEBUG] SSH key name: {ssh_key_name}")
-    print(f"[DEBUG] Delete existing: {delete_existing}")
-    print(f"[DEBUG] Runner count: {runner_count}")
+    cache = ResourceCache(client)
+    runners = None
+    if any(index >= count for index in indexed_servers(cache.servers())):
+        # Scaling down: one listing tells which servers are running a job
+        runners = list_org_runners(github_token, "armbian")
+    plan = plan_fleet(cache.servers(), count, runners)
+    print(f"[INFO] Reconcile plan: keep {len(plan['keep'])}, "
+          f"create {len(plan['create'])}, delete {len(plan['delete'])}, deferred {len(plan['deferred'])}")
+    for key in ("create", "delete", "deferred"):
+        if plan[key]:
+            print(f"[INFO]   {key}: {', '.join(plan[key])}")
+
+    result = {"action": "reconcile", "desired": count, **plan, "servers": []}
+    if dry_run:
+        result["dry_run"] = True
+        return result
+
+    if plan["delete"]:
+        delete_servers(
+            client,
+            plan["delete"],
+            cache=cache,
+            github_token=github_token,
+            parallelism=parallelism,
+        )
+    if plan["create"]:
+        result["servers"] = create_servers(
+            client,
+            plan["create"],
+            server_type=server_type,
+            image=image,
+            ssh_key_name=ssh_key_name,
+            github_token=github_token,
+            runner_count=runner_count,
+            parallelism=parallelism,
+            cache=cache,
+            use_snapshot=use_snapshot,
+            wait_for_runners=wait_for_runners,
+            runner_timeout=runner_timeout,
+            locations=locations,
+            jit=jit,
+        )
+    return result
 
-    # Check if server exists
-    existing = client.servers.get_by_name(name)
-    if existing:
-        print(f"[DEBUG] Server {name} already exists (ID: {existing.id}, Status: {existing.status})")
-        if delete_existing:
-            print(f"Deleting existing server: {name}")
-            client.servers.delete(existing)
-            time.sleep(2)  # Wait for deletion
-            print(f"[DEBUG] Existing server deleted")
-        else:
-            print(f"[DEBUG] Returning existing server info")
-            return {
-                "name": name,
-                "status": "exists",
-                "id": existing.id,
-                "public_ip": existing.public_net.ipv4.ip if existing.public_net else None,
-            }
 
-    # Get SSH key
-    print(f"[DEBUG] Looking up SSH key '{ssh_key_name}'...")
-    ssh_keys = client.ssh_keys.get_all()
-    print(f"[DEBUG] Found {len(ssh_keys)} SSH keys in Hetzner")
-    ssh_key = None
-    for key in ssh_keys:
-        if key.name == ssh_key_name:
-            ssh_key = key
-            break
+def free_names(servers: dict, count: int, prefix: str = POOL_PREFIX) -> list[str]:
+    """Return the names of the `count` lowest <prefix>-<n> indexes not in servers."""
+    names = []
+    index = 0
+    while len(names) < count:
+        if index not in servers:
+            names.append(f"{prefix}-{index}")
+        index += 1
+    return names
 
-    if not ssh_key:
-        print(f"Warning: SSH key '{ssh_key_name}' not found, creating without SSH key")
-    else:
-        print(f"[DEBUG] Using SSH key: {ssh_key.name}")
 
-    # Get fallback server types
-    fallback_types = SERVER_TYPE_FALLBACKS.get(server_type, [server_type])
-    print(f"[DEBUG] Will try server types in order: {fallback_types}")
+def replenish_pool(
+    client: Client,
+    size: int,
+    server_type: str,
+    image: str,
+    ssh_key_name: str,
+    github_token: str,
+    runner_count: int = 2,
+    parallelism: int = DEFAULT_PARALLELISM,
+    use_snapshot: bool = True,
+    locations: Optional[list[str]] = None,
+    dry_run: bool = False,
+    jit: bool = False,
+) -> dict:
+    """
+    Bring the standby pool to `size` idle servers.
 
-    # Store original requested runner count
-    requested_runner_count = runner_count
+    Idle servers are created like any runner server, but labelled
+    pool=idle and with runners registered under STANDBY_RUNNER_LABELS, so
+    no job is scheduled on them until claim_standby() switches them over.
+    Unhealthy idle servers are replaced and surplus ones deleted (highest
+    indexes first). Claimed servers are left alone.
 
-    # Try creating server with fallback to smaller types
-    response = None
-    actual_server_type = None
-    actual_runner_count = None
+    Returns:
+        Dict with the plan and the results of the creates
+    """
+    cache = ResourceCache(client)
+    pool = indexed_servers(cache.servers(), POOL_PREFIX)
+    idle = {i: server for i, server in pool.items() if server.labels.get(POOL_LABEL) == POOL_IDLE}
+
+    delete = [server.name for server in idle.values() if server.status in UNHEALTHY_STATUSES]
+    healthy = sorted(i for i, server in idle.items() if server.status not in UNHEALTHY_STATUSES)
+    delete += [idle[i].name for i in healthy[size:]]
+    for name in delete:
+        pool = {i: server for i, server in pool.items() if server.name != name}
+    create = free_names(pool, max(0, size - len(healthy)))
+
+    print(f"[INFO] Standby pool: {min(len(healthy), size)} of {size} idle, "
+          f"create {len(create)}, delete {len(delete)}")
+    result = {"action": "replenish", "pool_size": size, "create": create, "delete": delete, "servers": []}
+    if dry_run:
+        result["dry_run"] = True
+        return result
+
+    if delete:
+        delete_servers(client, delete, cache=cache, github_token=github_token, parallelism=parallelism)
+    if create:
+        result["servers"] = create_servers(
+            client,
+            create,
+            server_type=server_type,
+            image=image,
+            ssh_key_name=ssh_key_name,
+            github_token=github_token,
+            runner_count=runner_count,
+            parallelism=parallelism,
+            cache=cache,
+            use_snapshot=use_snapshot,
+            locations=locations,
+            labels={POOL_LABEL: POOL_IDLE},
+            runner_labels=STANDBY_RUNNER_LABELS,
+            jit=jit,
+        )
+    return result
 
-    for i, try_type in enumerate(fallback_types):
-        print(f"Attempting to create server {name} with type {try_type} (attempt {i+1}/{len(fallback_types)})...")
 
-        # Adjust runner count based on server type
-        max_runners = MAX_RUNNERS_PER_TYPE.get(try_type, 1)
-        actual_runner_count = min(requested_runner_count, max_runners)
+def claim_standby(
+    client: Client,
+    count: int,
+    github_token: str,
+    organisation: str = "armbian",
+    create_options: Optional[dict] = None,
+) -> dict:
+    """
+    Put `count` idle standby servers to work.
+
+    A server is only claimed once all of its runners are online. Claiming
+    relabels the server pool=active and switches its runners' GitHub
+    labels to RUNNER_LABELS, which takes seconds instead of the minutes a
+    new server needs. Idle servers are taken lowest index first.
 
-        if try_type != server_type:
-            print(f"[INFO] Adjusted runner count from {requested_runner_count} to {actual_runner_count} for {try_type}")
+    Args:
+        client: Hetzner client
+        count: Number of servers wanted
+        github_token: GitHub token with runner admin rights
+        organisation: GitHub organisation the runners are registered at
+        create_options: create_servers() arguments (server_type, image,
+            ssh_key_name, ...) to create active servers for any shortfall;
+            without them a shortfall is only reported
 
-        # Generate cloud-init config with adjusted runner count
-        print(f"[DEBUG] Generating cloud-init config with {actual_runner_count} runner(s)...")
-        user_data = get_cloud_init_config(github_token, name, actual_runner_count)
-        print(f"[DEBUG] Cloud-init config length: {len(user_data)} bytes")
+    Returns:
+        Dict with the claimed servers and the shortfall
+    """
+    cache = ResourceCache(client)
+    pool = indexed_servers(cache.servers(), POOL_PREFIX)
+    runners = list_org_runners(github_token, organisation)
 
+    claimed = []
+    for index in sorted(pool):
+        if len(claimed) == count:
+            break
+        server = pool[index]
+        if server.labels.get(POOL_LABEL) != POOL_IDLE or server.status != STATUS_RUNNING:
+            continue
+        server_runners = runners_of_server(runners, server.name)
+        if not server_runners or any(runner["status"] != "online" for runner in server_runners):
+            print(f"[INFO] {server.name}: runners not online yet, not claiming it")
+            continue
+
+        # Mark the server first: if relabelling the runners fails half-way,
+        # it no longer counts as idle and replenish creates a replacement
         try:
-            response = client.servers.create(
-                name=name,
-                server_type=ServerType(name=try_type),
-                image=Image(name=image),
-                ssh_keys=[ssh_key] if ssh_key else [],
-                user_data=user_data,
+            hcloud_call(client.servers.update, server, labels={**server.labels, POOL_LABEL: POOL_ACTIVE})
+            for runner in server_runners:
+                set_runner_labels(github_token, organisation, runner["id"], RUNNER_LABELS)
+        except (urllib.error.URLError, OSError, *api_error_types()) as e:
+            print(f"[WARNING] Could not claim {server.name}: {e}")
+            continue
+        print(f"Claimed {server.name} ({len(server_runners)} runner(s))")
+        claimed.append({"name": server.name, "id": server.id, "status": "claimed", "runners": len(server_runners)})
+
+    shortfall = count - len(claimed)
+    result = {"action": "claim", "requested": count, "claimed": len(claimed), "shortfall": shortfall, "servers": claimed}
+    if shortfall and create_options is not None:
+        print(f"[INFO] Standby pool short by {shortfall}, creating active server(s)")
+        result["servers"] += create_servers(
+            client,
+            free_names(pool, shortfall),
+            github_token=github_token,
+            cache=cache,
+            labels={POOL_LABEL: POOL_ACTIVE},
+            **create_options,
+        )
+    return result
+
+
+def count_runner_jobs(github_token: str, repos: list[str], labels=RUNNER_LABELS) -> dict:
+    """
+    Count the jobs that want one of our runners.
+
+    Lists the queued and in-progress workflow runs of each repository and
+    their jobs, every page of them. A job counts if it asks for any of `labels`; in-progress
+    jobs only count if they run on one of our servers' runners.
+
+    Args:
+        github_token: GitHub token with read access to the repositories' actions
+        repos: Repositories as "owner/name"
+        labels: Runner labels that identify our runners
+
+    Returns:
+        Dict with the numbers of "queued" and "in_progress" jobs
+    """
+    counts = {"queued": 0, "in_progress": 0}
+    for repo in repos:
+        for run_status in ("queued", "in_progress"):
+            runs = github_get_all(
+                github_token, f"{GITHUB_API}/repos/{repo}/actions/runs?status={run_status}", "workflow_runs"
             )
-            actual_server_type = try_type
-            print(f"[DEBUG] Server creation initiated with type {try_type}")
-            break
-        except APIException as e:
-            error_str = str(e).lower()
-            if "resource_unavailable" in error_str or "placement" in error_str or "unavailable" in error_str:
-                print(f"[WARNING] Server type {try_type} unavailable: {e}")
-                if i < len(fallback_types) - 1:
-                    print(f"[INFO] Retrying with smaller server type...")
-                    continue
-                else:
-                    print(f"[ERROR] All server types exhausted. Last error: {e}")
-                    raise
-            else:
-                # Not a placement error, re-raise immediately
-                print(f"[ERROR] Server creation failed with non-placement error: {e}")
-                raise
-        except Exception as e:
-            print(f"[ERROR] Server creation failed: {e}")
-            raise
+            for run in runs:
+                jobs = github_get_all(
+                    github_token, f"{GITHUB_API}/repos/{repo}/actions/runs/{run['id']}/jobs?filter=latest", "jobs"
+                )
+                for job in jobs:
+                    if job["status"] not in counts or not set(labels) & set(job.get("labels", [])):
+                        continue
+                    if job["status"] == "in_progress" and not (job.get("runner_name") or "").startswith(SERVER_PREFIX):
+                        continue
+                    counts[job["status"]] += 1
+    return counts
+
+
+def plan_autoscale(
+    current: int,
+    jobs: dict,
+    runners_per_server: int,
+    min_servers: int = 0,
+    max_servers: int = DEFAULT_MAX_SERVERS,
+    hysteresis: int = DEFAULT_AUTOSCALE_HYSTERESIS,
+    cooling_down: bool = False,
+) -> dict:
+    """
+    Decide how many servers the fleet should have.
 
-    if not response or not actual_server_type:
-        print(f"[ERROR] Failed to create server after trying all types")
-        raise Exception("Server creation failed: all types exhausted")
+    Every running job occupies one runner and every queued job needs one,
+    so the demand is their sum, in servers of runners_per_server runners.
+    The fleet grows to the demand right away. It only shrinks when it is
+    more than `hysteresis` servers above the demand and no scale event
+    happened within the cooldown, and then keeps `hysteresis` spare.
 
-    # Wait for server creation to complete
-    if response.action:
-        print(f"[DEBUG] Waiting for server creation action to complete...")
-        response.action.wait_until_finished()
-        print(f"[DEBUG] Server creation action completed")
+    Returns:
+        Dict with the demand and the target number of servers
+    """
+    demand = -(-(jobs["queued"] + jobs["in_progress"]) // max(1, runners_per_server))
+    demand = max(min_servers, min(max_servers, demand))
+    target = current
+    if demand > current:
+        target = demand
+    elif current > demand + hysteresis and not cooling_down:
+        target = max(min_servers, demand + hysteresis)
+    return {"demand": demand, "current": current, "target": target}
 
-    # Get the server
-    server = client.servers.get_by_name(name)
-    print(f"[DEBUG] Server retrieved: {server.name} (ID: {server.id})")
 
-    # Wait for server to be running
-    print(f"Waiting for {name} to be running...")
-    for i in range(60):  # Wait up to 5 minutes
-        server = client.servers.get_by_name(name)
-        print(f"[DEBUG] Check {i+1}/60: Status={server.status}")
-        if server.status == Server.STATUS_RUNNING:
-            print(f"[DEBUG] Server is running!")
-            break
-        time.sleep(5)
-    else:
-        print(f"[WARNING] Server did not reach RUNNING status after 5 minutes")
-        print(f"[DEBUG] Final status: {server.status}")
+def autoscale_fleet(
+    client: Client,
+    github_token: str,
+    repos: list[str],
+    server_type: str,
+    image: str,
+    ssh_key_name: str,
+    runner_count: int = 2,
+    min_servers: int = 0,
+    max_servers: int = DEFAULT_MAX_SERVERS,
+    hysteresis: int = DEFAULT_AUTOSCALE_HYSTERESIS,
+    cooldown: float = DEFAULT_AUTOSCALE_COOLDOWN,
+    parallelism: int = DEFAULT_PARALLELISM,
+    use_snapshot: bool = True,
+    locations: Optional[list[str]] = None,
+    dry_run: bool = False,
+    organisation: str = "armbian",
+    jit: bool = False,
+) -> dict:
+    """
+    Size the runner fleet to the GitHub Actions job queue.
 
-    result = {
-        "name": name,
-        "status": server.status,
-        "id": server.id,
-        "public_ip": server.public_net.ipv4.ip if server.public_net else None,
-        "server_type": server.server_type.name,
-        "image": server.image.name if server.image else None,
-        "requested_type": server_type,
-        "requested_runners": requested_runner_count,
-        "actual_runners": actual_runner_count,
-    }
+    Scaling up creates servers at the lowest free hetzner-runner-<n>
+    indexes. Servers in an unhealthy state do not count towards the fleet
+    and are deleted; scaling up creates the replacements under their
+    names first, like plan_fleet(). Scaling down only deletes servers whose runners are all
+    registered and idle, highest index first, so no running job is killed.
+    The time of the last scale event is kept in the state cache (see
+    StateCache) to enforce the cooldown across runs.
 
-    # Warn if we had to fall back to a smaller type or fewer runners
-    if actual_server_type != server_type:
-        print(f"[WARNING] Requested {server_type} but created {actual_server_type} due to capacity constraints")
-    if actual_runner_count != requested_runner_count:
-        print(f"[WARNING] Requested {requested_runner_count} runners but configured {actual_runner_count} for {actual_server_type}")
+    Returns:
+        Dict with the job counts, the plan and the results of the changes
+    """
+    cache = ResourceCache(client)
+    servers = indexed_servers(cache.servers())
+    fleet = {index: server for index, server in servers.items() if server.status not in UNHEALTHY_STATUSES}
+    broken = []
+    for index, server in sorted(servers.items()):
+        if index not in fleet:
+            print(f"[INFO] {server.name} is {server.status}, replacing it")
+            broken.append(server.name)
+
+    jobs = count_runner_jobs(github_token, repos)
+    state = state_cache.get("autoscale", github_token, organisation, max_age=float("inf")) or {}
+    last_scale = state.get("last_scale", 0)
+    cooling_down = time.time() - last_scale < cooldown
+    runners_per_server = min(runner_count, MAX_RUNNERS_PER_TYPE.get(server_type, 1))
+    plan = plan_autoscale(
+        len(fleet), jobs, runners_per_server, min_servers, max_servers, hysteresis, cooling_down
+    )
+    print(f"[INFO] Jobs: {jobs['queued']} queued, {jobs['in_progress']} running on our runners; "
+          f"servers: {plan['current']} now, {plan['demand']} needed, target {plan['target']}"
+          f"{' (cooling down)' if cooling_down else ''}")
+
+    result = {"action": "autoscale", "jobs": jobs, **plan, "create": [], "delete": [], "servers": []}
+    if plan["target"] > plan["current"]:
+        missing = plan["target"] - plan["current"]
+        result["create"] = broken[:missing] + free_names(servers, missing - len(broken[:missing]), SERVER_PREFIX)
+    elif plan["target"] < plan["current"]:
+        runners = list_org_runners(github_token, organisation)
+        for index in sorted(fleet, reverse=True):
+            if len(result["delete"]) == plan["current"] - plan["target"]:
+                break
+            server_runners = runners_of_server(runners, fleet[index].name)
+            if server_runners and not any(runner.get("busy") for runner in server_runners):
+                result["delete"].append(fleet[index].name)
+    scaled = bool(result["create"] or result["delete"])
+    result["delete"] = broken + result["delete"]
+
+    for key in ("create", "delete"):
+        if result[key]:
+            print(f"[INFO]   {key}: {', '.join(result[key])}")
+    if dry_run:
+        result["dry_run"] = True
+        return result
+
+    if result["delete"]:
+        deleted = delete_servers(
+            client, result["delete"], cache=cache, github_token=github_token, parallelism=parallelism
+        )
+        result["servers"] += deleted["servers"]
+    if result["create"]:
+        result["servers"] += create_servers(
+            client,
+            result["create"],
+            server_type=server_type,
+            image=image,
+            ssh_key_name=ssh_key_name,
+            github_token=github_token,
+            runner_count=runner_count,
+            parallelism=parallelism,
+            cache=cache,
+            use_snapshot=use_snapshot,
+            locations=locations,
+            jit=jit,
+        )
+    if scaled:
+        state_cache.put("autoscale", github_token, organisation, {"last_scale": time.time()})
+    return result
 
-    print(f"[DEBUG] Server creation result: {result}")
+
+def reap_idle_servers(
+    client: Client,
+    github_token: str,
+    idle_window: float = DEFAULT_IDLE_WINDOW,
+    parallelism: int = DEFAULT_PARALLELISM,
+    dry_run: bool = False,
+    organisation: str = "armbian",
+    cache: Optional[ResourceCache] = None,
+    prefixes: tuple[str, ...] = (SERVER_PREFIX, POOL_PREFIX, EPHEMERAL_PREFIX),
+) -> dict:
+    """
+    Delete runner servers whose runners have had nothing to do for a while.
+
+    One org runner listing is mapped back to the <prefix>-<n> servers of
+    each of `prefixes`: by default the hetzner-runner-<n> servers, claimed
+    standby servers (idle standby servers are meant to be idle and are
+    left alone) and ephemeral servers. GitHub does not report
+    since when a runner is idle, so the first time each server is seen
+    with no busy runner is kept in the state cache, in an entry per set of
+    prefixes; a server is deleted once that was more than idle_window
+    seconds ago. Servers without
+    registered runners are still booting (or broken) and are not touched,
+    except ephemeral ones: their JIT runners are registered before the
+    server is created, so no runner means it has done its job. An
+    ephemeral server with an online runner is waiting for its job and is
+    kept however long that takes.
+
+    Returns:
+        Dict with the servers reaped and the results of the deletes
+    """
+    if cache is None:
+        cache = ResourceCache(client)
+    servers = []
+    for prefix in prefixes:
+        servers += [
+            server for server in indexed_servers(cache.servers(), prefix).values()
+            if prefix != POOL_PREFIX or server.labels.get(POOL_LABEL) == POOL_ACTIVE
+        ]
+    ephemeral = indexed_servers(cache.servers(), EPHEMERAL_PREFIX).values() if EPHEMERAL_PREFIX in prefixes else []
+    runners = list_org_runners(github_token, organisation)
+    # A separate entry for each set of prefixes, so the reap action and the
+    # ephemeral loop do not drop each other's idle times
+    state_key = ",".join((organisation, *prefixes))
+    idle_since = state_cache.get("reap", github_token, state_key, max_age=float("inf")) or {}
+
+    now = time.time()
+    seen = {}
+    reap = []
+    ephemeral_names = {server.name for server in ephemeral}
+    for server in servers:
+        server_runners = runners_of_server(runners, server.name)
+        if server.name in ephemeral_names:
+            if not server_runners:
+                print(f"[INFO] {server.name}: single-job runner is done, reaping it")
+                reap.append(server.name)
+                continue
+            # Waiting for its job is what a single-job server is for; only
+            # one whose runner does not come online is reaped
+            if any(runner.get("status") == "online" for runner in server_runners):
+                continue
+        if not server_runners or any(runner.get("busy") for runner in server_runners):
+            continue
+        seen[server.name] = idle_since.get(server.name, now)
+        idle = now - seen[server.name]
+        if idle >= idle_window:
+            print(f"[INFO] {server.name}: runners idle or offline for {idle / 60:.0f} min, reaping it")
+            reap.append(server.name)
+
+    print(f"[INFO] Reap: {len(seen)} of {len(servers)} server(s) idle, {len(reap)} to delete")
+    result = {"action": "reap", "idle_window": idle_window, "reap": reap, "servers": []}
+    if dry_run:
+        result["dry_run"] = True
+        reap = []
+    elif reap:
+        result["servers"] = delete_servers(
+            client, reap, cache=cache, github_token=github_token, organisation=organisation, parallelism=parallelism
+        )["servers"]
+    # Busy, deleted and vanished servers are dropped, so their idle time
+    # starts over the next time they are seen idle
+    state_cache.put("reap", github_token, state_key, {
+        name: since for name, since in seen.items() if name not in reap
+    })
     return result
 
 
-def delete_servers(
+def run_ephemeral_fleet(
     client: Client,
-    server_names: list[str],
+    count: int,
+    server_type: str,
+    image: str,
+    ssh_key_name: str,
+    github_token: str,
+    interval: float = DEFAULT_EPHEMERAL_INTERVAL,
+    duration: float = 0,
+    idle_window: float = DEFAULT_IDLE_WINDOW,
+    parallelism: int = DEFAULT_PARALLELISM,
+    use_snapshot: bool = True,
+    locations: Optional[list[str]] = None,
+    dry_run: bool = False,
+    organisation: str = "armbian",
 ) -> dict:
     """
-    Delete servers by name.
+    Keep `count` fresh single-job servers waiting for jobs.
 
-    Args:
-        client: Hetzner client
-        server_names: List of server names to delete
+    Every `interval` seconds until `duration` has passed (one pass if 0),
+    reap_idle_servers() deletes the ephemeral servers whose runner has
+    finished its job (other runner servers are left to the reap action), then new ones are created at the lowest free
+    hetzner-runner-ephemeral-<n> indexes until `count` of them are not
+    busy. Every server gets one JIT runner, so no host is ever reused.
 
     Returns:
-        Dict with deletion results
+        Dict with the servers reaped and the results of the deletes and creates
     """
-    results = []
-    for name in server_names:
-        server = client.servers.get_by_name(name)
-        if server:
-            print(f"Deleting server: {name} (ID: {server.id})")
-            client.servers.delete(server)
-            results.append({"name": name, "status": "deleted", "id": server.id})
-        else:
-            results.append({"name": name, "status": "not_found"})
+    deadline = time.time() + duration
+    result = {"action": "ephemeral", "count": count, "passes": 0, "reaped": [], "created": [], "servers": []}
+    while True:
+        cache = ResourceCache(client)
+        reaped = reap_idle_servers(
+            client, github_token, idle_window, parallelism, dry_run, organisation=organisation, cache=cache,
+            prefixes=(EPHEMERAL_PREFIX,),
+        )
+        result["reaped"] += reaped["reap"]
+        result["servers"] += reaped["servers"]
+
+        # The listing reap_idle_servers() just made, from the state cache
+        runners = list_org_runners(github_token, organisation, max_age=RUNNER_LIST_TTL)
+        fleet = {
+            index: server for index, server in indexed_servers(cache.servers(), EPHEMERAL_PREFIX).items()
+            if server.name not in reaped["reap"]
+        }
+        available = [
+            server for server in fleet.values()
+            if server.status not in UNHEALTHY_STATUSES
+            and not any(runner.get("busy") for runner in runners_of_server(runners, server.name))
+        ]
+        create = free_names(fleet, max(0, count - len(available)), EPHEMERAL_PREFIX)
+        print(f"[INFO] Ephemeral: {len(available)} of {count} server(s) waiting for a job, create {len(create)}")
+
+        if create and not dry_run:
+            result["created"] += create
+            result["servers"] += create_servers(
+                client,
+                create,
+                server_type=server_type,
+                image=image,
+                ssh_key_name=ssh_key_name,
+                github_token=github_token,
+                runner_count=1,
+                parallelism=parallelism,
+                cache=cache,
+                use_snapshot=use_snapshot,
+                locations=locations,
+                jit=True,
+            )
+        result["passes"] += 1
+        if dry_run or time.time() + interval > deadline:
+            break
+        time.sleep(interval)
+
+    if dry_run:
+        result["dry_run"] = True
+    return result
 
-    return {"deleted": len([r for r in results if r["status"] == "deleted"])}
 
+def main(argv: Optional[list[str]] = None, client: Optional[Client] = None) -> int:
+    """
+    Main entry point.
 
-def main():
-    """Main entry point."""
+    Args:
+        argv: Command line arguments (default: sys.argv[1:])
+        client: Hetzner client to use as is instead of one built from the
+            token, e.g. a fake_hcloud.FakeHetzner for benchmarks
+    """
     print("[DEBUG] main() function started")
     print(f"[DEBUG] sys.argv: {sys.argv}")
     print(f"[DEBUG] Environment HCLOUD_TOKEN: {'SET' if os.environ.get('HCLOUD_TOKEN') else 'NOT SET'}")
@@ -376,8 +3215,14 @@ def main():
     )
     parser.add_argument(
         "action",
-        choices=["create", "delete"],
-        help="Action to perform"
+        choices=["create", "delete", "snapshot", "reconcile", "claim", "replenish", "autoscale", "reap", "ephemeral"],
+        help="Action to perform (snapshot: build the pre-baked runner image; "
+             "reconcile: bring the fleet to --count servers with minimal changes; "
+             "claim: put --count standby servers to work; "
+             "replenish: refill the standby pool to --pool-size idle servers; "
+             "autoscale: size the fleet to the queued and running jobs of --repos; "
+             "reap: delete servers whose runners were idle for --idle-window seconds; "
+             "ephemeral: keep --count single-job servers waiting and delete the used ones)"
     )
     parser.add_argument(
         "--hetzner-token",
@@ -429,8 +3274,138 @@ def main():
         default=2,
         help="Number of runners per server (default: 2)",
     )
+    parser.add_argument(
+        "--no-snapshot",
+        action="store_true",
+        help="Always boot the plain image with the full cloud-init, even if a runner snapshot exists",
+    )
+    parser.add_argument(
+        "--jit",
+        action="store_true",
+        help="Register the runners here and give each server only their just-in-time configs, "
+             "instead of the GitHub token (JIT runners take a single job each)",
+    )
+    parser.add_argument(
+        "--ephemeral",
+        action="store_true",
+        help=f"create: make single-job servers ({EPHEMERAL_PREFIX}-<n>, one JIT runner each) "
+             "that reap or the ephemeral action delete once their job is done",
+    )
+    parser.add_argument(
+        "--interval",
+        type=int,
+        default=DEFAULT_EPHEMERAL_INTERVAL,
+        help=f"ephemeral: seconds between passes (default: {DEFAULT_EPHEMERAL_INTERVAL})",
+    )
+    parser.add_argument(
+        "--duration",
+        type=int,
+        default=0,
+        help="ephemeral: keep making passes for this many seconds (default: 0, a single pass)",
+    )
+    parser.add_argument(
+        "--wait-for-runners",
+        action="store_true",
+        help="Wait until each server's runners are online at GitHub, not just until the VM is running",
+    )
+    parser.add_argument(
+        "--runner-timeout",
+        type=int,
+        default=DEFAULT_RUNNER_TIMEOUT,
+        help=f"Seconds to wait for runners with --wait-for-runners (default: {DEFAULT_RUNNER_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--locations",
+        type=lambda value: [loc.strip() for loc in value.split(",") if loc.strip()],
+        default=None,
+        help="Comma-separated Hetzner locations to place servers in, in order of preference (default: any)",
+    )
+    parser.add_argument(
+        "--target-runners",
+        type=int,
+        default=None,
+        help="create: provision as few servers as possible to reach this many runners (overrides --count)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print a JSON line (and, on GitHub Actions, update the step outputs) "
+             "as each server is created, running and has its runners online",
+    )
+    parser.add_argument(
+        "--journal",
+        help=f"Journal the provisioning steps to this file (default with --resume: journal.jsonl in ${STATE_DIR_ENV})",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="create: journal the provisioning steps, and finish the servers an earlier run left incomplete",
+    )
+    parser.add_argument(
+        "--trace-file",
+        default=None,
+        help="Write timing spans of every phase to this file (Chrome trace if it ends in .json, JSON lines otherwise)",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=None,
+        help="replenish: number of idle standby servers to keep",
+    )
+    parser.add_argument(
+        "--claim-only",
+        action="store_true",
+        help="claim: only report a shortfall of idle servers instead of creating active ones for it",
+    )
+    parser.add_argument(
+        "--repos",
+        type=lambda value: [repo.strip() for repo in value.split(",") if repo.strip()],
+        default=None,
+        help="autoscale: comma-separated repositories (owner/name) whose job queues to follow",
+    )
+    parser.add_argument(
+        "--min-servers",
+        type=int,
+        default=0,
+        help="autoscale: never scale below this many servers (default: 0)",
+    )
+    parser.add_argument(
+        "--max-servers",
+        type=int,
+        default=DEFAULT_MAX_SERVERS,
+        help=f"autoscale: never scale above this many servers (default: {DEFAULT_MAX_SERVERS})",
+    )
+    parser.add_argument(
+        "--hysteresis",
+        type=int,
+        default=DEFAULT_AUTOSCALE_HYSTERESIS,
+        help=f"autoscale: spare servers kept when scaling down (default: {DEFAULT_AUTOSCALE_HYSTERESIS})",
+    )
+    parser.add_argument(
+        "--cooldown",
+        type=int,
+        default=DEFAULT_AUTOSCALE_COOLDOWN,
+        help=f"autoscale: seconds after a scale event before scaling down (default: {DEFAULT_AUTOSCALE_COOLDOWN})",
+    )
+    parser.add_argument(
+        "--idle-window",
+        type=int,
+        default=DEFAULT_IDLE_WINDOW,
+        help=f"reap, ephemeral: seconds a server's runners must have been idle or offline (default: {DEFAULT_IDLE_WINDOW})",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="reconcile, replenish, autoscale, reap, ephemeral: only print the plan",
+    )
+    parser.add_argument(
+        "--parallelism",
+        type=int,
+        default=DEFAULT_PARALLELISM,
+        help=f"Maximum servers provisioned concurrently (default: {DEFAULT_PARALLELISM})",
+    )
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     print(f"[DEBUG] Arguments parsed successfully")
 
     # Debug: Show parsed arguments
@@ -442,6 +3417,12 @@ def main():
     print(f"[DEBUG] Index: {args.index}")
     print(f"[DEBUG] Delete existing: {args.delete_existing}")
     print(f"[DEBUG] Runner count: {args.runner_count}")
+    print(f"[DEBUG] Parallelism: {args.parallelism}")
+    print(f"[DEBUG] Use snapshot: {not args.no_snapshot}")
+    print(f"[DEBUG] Wait for runners: {args.wait_for_runners}")
+    print(f"[DEBUG] Resume: {args.resume}")
+    print(f"[DEBUG] Locations: {args.locations or 'any'}")
+    print(f"[DEBUG] Target runners: {args.target_runners}")
     print(f"[DEBUG] Hetzner token present: {bool(args.hetzner_token)}")
     print(f"[DEBUG] GitHub token present: {bool(args.github_token)}")
     print(f"[DEBUG] GitHub token value: '{args.github_token}'")
@@ -450,9 +3431,29 @@ def main():
         print("Error: Hetzner token required (use --hetzner-token or HCLOUD_TOKEN env var)")
         sys.exit(1)
 
-    # GitHub token only required for create action
-    if args.action != "delete" and not args.github_token:
-        print("Error: GitHub token required for create action (use --github-token or GITHUB_TOKEN env var)")
+    if args.action == "replenish" and args.pool_size is None:
+        print("Error: --pool-size required for replenish")
+        sys.exit(1)
+
+    if args.action == "autoscale" and not args.repos:
+        print("Error: --repos required for autoscale")
+        sys.exit(1)
+
+    # Single-job servers run one JIT runner each
+    if args.ephemeral or args.action == "ephemeral":
+        args.runner_count = 1
+        args.jit = True
+
+    if args.stream:
+        milestones.enable(os.environ.get("GITHUB_OUTPUT"))
+    if args.resume or args.journal:
+        journal.path = args.journal or os.path.join(state_cache.root(), "journal.jsonl")
+
+    # GitHub token only required for actions that create servers or
+    # relabel runners
+    needs_github = args.action in ("create", "reconcile", "claim", "replenish", "autoscale", "reap", "ephemeral")
+    if needs_github and not args.github_token:
+        print(f"Error: GitHub token required for {args.action} action (use --github-token or GITHUB_TOKEN env var)")
         print(f"[DEBUG] args.action: {args.action}")
         print(f"[DEBUG] args.github_token: '{args.github_token}'")
         sys.exit(1)
@@ -460,54 +3461,189 @@ def main():
     # Validate the GitHub token NOW, before we spin up Hetzner VMs that
     # won't be usable if the token is stale. Cheap read-only API call;
     # exits non-zero with an actionable error on 401/403/404/network.
-    # Skip for delete (no registration happens there).
+    # Skip for delete and snapshot (no registration happens there).
     #
-    # Organisation is hardcoded here to match the value baked into
-    # get_cloud_init_config() (`organisation=armbian` on the
-    # module_armbian_runners install line). Parameterise both together
-    # if this action is ever reused for a different org.
-    if args.action != "delete":
-        validate_github_token(args.github_token, organisation="armbian")
+    # Organisation is hardcoded here to match CLOUD_INIT_ORGANISATION,
+    # which the runners part of the cloud-init registers with.
+    # Parameterise both together if this action is ever reused for a
+    # different org.
+    if needs_github and args.action != "reap":
+        # Also before any API call: a template edit that pushes user_data
+        # over Hetzner's limit would otherwise fail every create
+        try:
+            preflight_cloud_init(args.github_token, args.server_type, args.runner_count)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] cloud-init: {e}")
+            sys.exit(1)
+    if needs_github and not args.dry_run:
+        with tracer.span("validate_github_token"):
+            validate_github_token(args.github_token, organisation="armbian")
 
     # Create client
-    client = Client(
-        token=args.hetzner_token,
-        application_name="gh-runner-deployer",
-        application_version="1.0.0",
-    )
+    if client is None:
+        if args.action == "delete":
+            # Deleting needs three endpoints; skip loading the SDK for it
+            client = HetznerREST(args.hetzner_token)
+        else:
+            client = hcloud_client(args.hetzner_token)
 
     if args.action == "delete":
         # Delete servers
         server_names = [f"{SERVER_PREFIX}-{i}" for i in range(args.index, args.index + args.count)]
         print(f"[DEBUG] Servers to delete: {server_names}")
-        result = delete_servers(client, server_names)
+        result = delete_servers(
+            client,
+            server_names,
+            github_token=args.github_token,
+            parallelism=args.parallelism,
+        )
+    elif args.action == "snapshot":
+        result = build_snapshot(client, image=args.image, ssh_key_name=args.ssh_key)
+    elif args.action == "reconcile":
+        result = reconcile_fleet(
+            client,
+            count=args.count,
+            server_type=args.server_type,
+            image=args.image,
+            ssh_key_name=args.ssh_key,
+            github_token=args.github_token,
+            runner_count=args.runner_count,
+            parallelism=args.parallelism,
+            use_snapshot=not args.no_snapshot,
+            jit=args.jit,
+            wait_for_runners=args.wait_for_runners,
+            runner_timeout=args.runner_timeout,
+            dry_run=args.dry_run,
+            locations=args.locations,
+        )
+    elif args.action == "replenish":
+        result = replenish_pool(
+            client,
+            size=args.pool_size,
+            server_type=args.server_type,
+            image=args.image,
+            ssh_key_name=args.ssh_key,
+            github_token=args.github_token,
+            runner_count=args.runner_count,
+            parallelism=args.parallelism,
+            use_snapshot=not args.no_snapshot,
+            jit=args.jit,
+            locations=args.locations,
+            dry_run=args.dry_run,
+        )
+    elif args.action == "autoscale":
+        result = autoscale_fleet(
+            client,
+            github_token=args.github_token,
+            repos=args.repos,
+            server_type=args.server_type,
+            image=args.image,
+            ssh_key_name=args.ssh_key,
+            runner_count=args.runner_count,
+            min_servers=args.min_servers,
+            max_servers=args.max_servers,
+            hysteresis=args.hysteresis,
+            cooldown=args.cooldown,
+            parallelism=args.parallelism,
+            use_snapshot=not args.no_snapshot,
+            jit=args.jit,
+            locations=args.locations,
+            dry_run=args.dry_run,
+        )
+    elif args.action == "ephemeral":
+        result = run_ephemeral_fleet(
+            client,
+            args.count,
+            server_type=args.server_type,
+            image=args.image,
+            ssh_key_name=args.ssh_key,
+            github_token=args.github_token,
+            interval=args.interval,
+            duration=args.duration,
+            idle_window=args.idle_window,
+            parallelism=args.parallelism,
+            use_snapshot=not args.no_snapshot,
+            locations=args.locations,
+            dry_run=args.dry_run,
+        )
+    elif args.action == "reap":
+        result = reap_idle_servers(
+            client,
+            github_token=args.github_token,
+            idle_window=args.idle_window,
+            parallelism=args.parallelism,
+            dry_run=args.dry_run,
+        )
+    elif args.action == "claim":
+        create_options = None
+        if not args.claim_only:
+            create_options = {
+                "server_type": args.server_type,
+                "image": args.image,
+                "ssh_key_name": args.ssh_key,
+                "runner_count": args.runner_count,
+                "parallelism": args.parallelism,
+                "use_snapshot": not args.no_snapshot,
+                "jit": args.jit,
+                "wait_for_runners": args.wait_for_runners,
+                "runner_timeout": args.runner_timeout,
+                "locations": args.locations,
+            }
+        result = claim_standby(client, args.count, args.github_token, create_options=create_options)
     else:
         # Create servers
-        servers = []
-        print(f"[DEBUG] Creating {args.count} server(s) starting from index {args.index}")
-        for i in range(args.count):
-            server_name = f"{SERVER_PREFIX}-{args.index + i}"
-            print(f"[DEBUG] Creating server {i+1}/{args.count}: {server_name}")
-            server = create_server(
-                client,
-                name=server_name,
-                server_type=args.server_type,
-                image=args.image,
-                ssh_key_name=args.ssh_key,
-                github_token=args.github_token,
-                delete_existing=args.delete_existing,
-                runner_count=args.runner_count,
+        cache = ResourceCache(client)
+        count = args.count
+        placement = None
+        if args.target_runners:
+            placement = plan_placement(
+                cache,
+                args.server_type,
+                args.runner_count,
+                target_runners=args.target_runners,
+                locations=args.locations,
             )
-            servers.append(server)
+            count = len(placement)
+        prefix = EPHEMERAL_PREFIX if args.ephemeral else SERVER_PREFIX
+        server_names = [f"{prefix}-{args.index + i}" for i in range(count)]
+        print(f"[DEBUG] Creating {count} server(s) starting from index {args.index}")
+        servers = create_servers(
+            client,
+            server_names,
+            server_type=args.server_type,
+            image=args.image,
+            ssh_key_name=args.ssh_key,
+            github_token=args.github_token,
+            delete_existing=args.delete_existing,
+            runner_count=args.runner_count,
+            parallelism=args.parallelism,
+            use_snapshot=not args.no_snapshot,
+            jit=args.jit,
+            resume=args.resume,
+            wait_for_runners=args.wait_for_runners,
+            runner_timeout=args.runner_timeout,
+            cache=cache,
+            placement=placement,
+            locations=args.locations,
+        )
 
         result = {
             "action": "create",
             "servers": servers,
         }
 
+    journal.compact()
+    if args.trace_file:
+        tracer.write(args.trace_file)
+        print(f"[DEBUG] Wrote {len(tracer.spans)} trace span(s) to {args.trace_file}")
+
     # Output JSON
     print(f"[DEBUG] Final result: {json.dumps(result, indent=2)}")
     print(json.dumps(result, indent=2))
+
+    for entry in result.get("servers", []):
+        if entry.get("status") == "error" or entry.get("runners_ready") is False:
+            return 1
     return 0
 
 
@@ -9,26 +9,39 @@ using armbian-config.
 from __future__ import annotations
 
 import argparse
+import collections
+import functools
 import io
+import errno
 import os
+import select
+import selectors
+import socket
 import sys
+import threading
 import time
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Optional
-
-try:
+from typing import TYPE_CHECKING, List, Dict, Optional
+
+from create_servers import (
+    SERVER_LABELS,
+    STATUS_RUNNING,
+    HetznerREST,
+    ResourceCache,
+    ServerStatusWatcher,
+    delete_servers,
+    hcloud_call,
+    hcloud_client,
+)
+
+# hcloud and paramiko are imported by the code that uses them, so
+# `disable` and --help start without loading either
+if TYPE_CHECKING:
+    import paramiko
     from hcloud import Client
-    from hcloud.images import Image
-    from hcloud.server_types import ServerType
     from hcloud.ssh_keys import SSHKey
-    from hcloud.actions import Action
-    from hcloud.servers.domain import Server
-    import paramiko
-except ImportError as e:
-    print(f"Missing required library: {e}")
-    print("Install with: pip install hcloud paramiko")
-    sys.exit(1)
 
 
 # Machine names for runners
@@ -37,6 +50,233 @@ MACHINE_NAMES = [
     "Foxtrot", "Papa", "Chimera", "Panther"
 ]
 
+# Remote output is streamed to the log as it arrives; only the last lines
+# are kept in memory for error reports
+OUTPUT_TAIL_LINES = 200
+
+# A remote command that prints nothing for this long is considered hung
+# (e.g. apt waiting forever on a dpkg lock) and is killed
+DEFAULT_STALL_TIMEOUT = 180
+
+# Default number of hosts deployed concurrently
+DEFAULT_WORKERS = len(MACHINE_NAMES)
+
+# A server is RUNNING well before sshd answers. SSHReadinessProber retries
+# every host this often, gives up on a single connection attempt after
+# SSH_ATTEMPT_TIMEOUT, and on the host after DEFAULT_SSH_READY_TIMEOUT.
+SSH_PORT = 22
+SSH_PROBE_INTERVAL = 0.25
+SSH_ATTEMPT_TIMEOUT = 3.0
+DEFAULT_SSH_READY_TIMEOUT = 300
+
+# Hosts are deployed in parallel; every line of output is prefixed with the
+# host the current thread is working on so interleaved logs stay readable
+_output_lock = threading.Lock()
+_log_context = threading.local()
+
+
+def log(message: str = "") -> None:
+    """Print a message, prefixed with the current thread's host name."""
+    prefix = getattr(_log_context, "prefix", "")
+    with _output_lock:
+        for line in str(message).split("\n"):
+            print(f"{prefix}{line}", flush=True)
+
+
+@functools.lru_cache(maxsize=None)
+def load_private_key(key_content: str) -> paramiko.PKey:
+    """Parse an RSA private key once per process."""
+    import paramiko
+
+    return paramiko.RSAKey.from_private_key(io.StringIO(key_content))
+
+
+class SSHConnectionPool:
+    """
+    One authenticated SSH connection per host, reused across commands.
+
+    A paramiko transport can carry many channels, so every command to a
+    host runs over the same connection instead of paying for a new TCP and
+    SSH handshake each time. Keepalives stop idle connections from being
+    dropped between install phases, and a dead connection is replaced
+    transparently on the next get().
+    """
+
+    def __init__(
+        self,
+        key_content: str,
+        username: str = "root",
+        connect_timeout: int = 30,
+        keepalive: int = 30,
+    ):
+        self.key_content = key_content
+        self.username = username
+        self.connect_timeout = connect_timeout
+        self.keepalive = keepalive
+        self._lock = threading.Lock()
+        self._clients: Dict[str, paramiko.SSHClient] = {}
+
+    def get(self, host: str) -> paramiko.SSHClient:
+        """Return a live connection to host, connecting if necessary."""
+        with self._lock:
+            ssh = self._clients.get(host)
+            if ssh is not None:
+                transport = ssh.get_transport()
+                if transport is not None and transport.is_active():
+                    return ssh
+                ssh.close()
+                del self._clients[host]
+
+        import paramiko
+
+        log(f"Connecting to {host}...")
+        ssh = paramiko.SSHClient()
+        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        ssh.connect(
+            hostname=host,
+            username=self.username,
+            pkey=load_private_key(self.key_content),
+            timeout=self.connect_timeout,
+        )
+        ssh.get_transport().set_keepalive(self.keepalive)
+
+        with self._lock:
+            previous = self._clients.get(host)
+            if previous is not None:
+                # Another thread connected first; keep one connection
+                ssh.close()
+                return previous
+            self._clients[host] = ssh
+        return ssh
+
+    def drop(self, host: str) -> None:
+        """Close and forget the connection to host."""
+        with self._lock:
+            ssh = self._clients.pop(host, None)
+        if ssh is not None:
+            ssh.close()
+
+    def close_all(self) -> None:
+        """Close every pooled connection."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for ssh in clients:
+            ssh.close()
+
+
+class SSHReadinessProber:
+    """
+    Wait for sshd on many hosts at once, from one thread.
+
+    Each waiting host gets a non-blocking connect to the SSH port, and once
+    that succeeds the server's identification line is read. The host is
+    ready when the line starts with "SSH-", i.e. sshd itself answers rather
+    than just something accepting on the port. Refused, reset and silent
+    attempts are dropped and retried every SSH_PROBE_INTERVAL seconds, so
+    a waiter is woken within a fraction of a second of sshd coming up,
+    without a paramiko connect timeout or a thread per host.
+    """
+
+    def __init__(
+        self,
+        port: int = SSH_PORT,
+        interval: float = SSH_PROBE_INTERVAL,
+        attempt_timeout: float = SSH_ATTEMPT_TIMEOUT,
+    ):
+        self.port = port
+        self.interval = interval
+        self.attempt_timeout = attempt_timeout
+        self._lock = threading.Lock()
+        self._waiting: Dict[str, threading.Event] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def wait(self, host: str, timeout: float = DEFAULT_SSH_READY_TIMEOUT) -> bool:
+        """Block until sshd on host answers; False after timeout seconds."""
+        with self._lock:
+            event = self._waiting.setdefault(host, threading.Event())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ssh-prober", daemon=True)
+                self._thread.start()
+        if event.wait(timeout):
+            return True
+        with self._lock:
+            if self._waiting.get(host) is event:
+                del self._waiting[host]
+        return False
+
+    def _run(self) -> None:
+        """Probe every waiting host until none is left."""
+        selector = selectors.DefaultSelector()
+        probes: Dict[str, Dict] = {}
+        next_attempt: Dict[str, float] = {}
+
+        def retry(host: str) -> None:
+            probe = probes.pop(host)
+            selector.unregister(probe["socket"])
+            probe["socket"].close()
+            next_attempt[host] = time.monotonic() + self.interval
+
+        try:
+            while True:
+                with self._lock:
+                    hosts = set(self._waiting)
+                    if not hosts:
+                        self._thread = None
+                        return
+
+                now = time.monotonic()
+                for host in list(probes):
+                    if host not in hosts or now - probes[host]["started"] > self.attempt_timeout:
+                        retry(host)
+                for host in hosts - probes.keys():
+                    if next_attempt.get(host, 0) > now:
+                        continue
+                    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+                    sock.setblocking(False)
+                    probes[host] = {"socket": sock, "started": now, "banner": b""}
+                    selector.register(sock, selectors.EVENT_WRITE, host)
+                    if sock.connect_ex((host, self.port)) not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                        retry(host)
+
+                for key, _ in selector.select(self.interval):
+                    host = key.data
+                    probe = probes[host]
+                    sock = probe["socket"]
+                    if key.events & selectors.EVENT_WRITE:
+                        # Connected, or failed: SO_ERROR tells which
+                        if sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR):
+                            retry(host)
+                        else:
+                            selector.modify(sock, selectors.EVENT_READ, host)
+                        continue
+                    try:
+                        data = sock.recv(256)
+                    except BlockingIOError:
+                        continue
+                    except OSError:
+                        data = b""
+                    if not data:
+                        retry(host)
+                        continue
+                    probe["banner"] += data
+                    if b"\n" not in probe["banner"] and len(probe["banner"]) < 255:
+                        continue
+                    ready = probe["banner"].startswith(b"SSH-")
+                    retry(host)
+                    if ready:
+                        with self._lock:
+                            event = self._waiting.pop(host, None)
+                        if event is not None:
+                            event.set()
+        finally:
+            for probe in probes.values():
+                probe["socket"].close()
+            selector.close()
+            with self._lock:
+                if self._thread is threading.current_thread():
+                    self._thread = None
+
 
 class RunnerDeployer:
     """Manages Hetzner server creation and runner deployment."""
@@ -55,6 +295,7 @@ class RunnerDeployer:
         label_primary: str = "self-hosted",
         label_secondary: str = "",
         organisation: str = "",
+        client: Optional[Client] = None,
     ):
         """
         Initialize the deployer.
@@ -72,6 +313,8 @@ class RunnerDeployer:
             label_primary: Primary labels for the runner
             label_secondary: Secondary labels for the runner
             organisation: GitHub organization name
+            client: Hetzner client to use as is instead of one built
+                from hetzner_token (e.g. a fake_hcloud.FakeHetzner)
         """
         self.hetzner_token = hetzner_token
         self.github_token = github_token
@@ -86,14 +329,21 @@ class RunnerDeployer:
         self.label_secondary = label_secondary
         self.organisation = organisation
 
-        self.client = Client(
-            token=hetzner_token,
-            application_name="armbian-runner-deployer",
-            application_version="1.0.0",
-        )
+        self.client = client or hcloud_client(hetzner_token, "armbian-runner-deployer")
+
+        # One shared poller for every server this deployer waits on, and one
+        # cache for the SSH key / server listings it looks things up in
+        self.watcher = ServerStatusWatcher(self.client)
+        self.cache = ResourceCache(self.client)
 
         # Load SSH key content for Paramiko
         self._init_ssh_key()
+        self.ssh_pool = SSHConnectionPool(self.ssh_key_content)
+        self.ssh_prober = SSHReadinessProber()
+
+    def close(self):
+        """Close all pooled SSH connections."""
+        self.ssh_pool.close_all()
 
     def _init_ssh_key(self):
         """Initialize SSH key from file or environment."""
@@ -108,25 +358,20 @@ class RunnerDeployer:
 
     def get_ssh_key(self) -> Optional[SSHKey]:
         """Get the SSH key object from Hetzner."""
-        ssh_keys = self.client.ssh_keys.get_all()
-        for key in ssh_keys:
-            if key.name == self.ssh_key_name:
-                return key
-        return None
+        return self.cache.ssh_key(self.ssh_key_name)
 
     def server_exists(self, name: str) -> bool:
         """Check if a server with the given name exists."""
-        servers = self.client.servers.get_all()
-        return any(s.name == name for s in servers)
+        return self.cache.server(name) is not None
 
     def delete_server(self, name: str) -> bool:
         """Delete a server by name."""
-        servers = self.client.servers.get_all()
-        for server in servers:
-            if server.name == name:
-                print(f"Deleting existing server: {name} (ID: {server.id})")
-                self.client.servers.delete(server)
-                return True
+        server = self.cache.server(name)
+        if server:
+            log(f"Deleting existing server: {name} (ID: {server.id})")
+            hcloud_call(hcloud_call(self.client.servers.delete, server).wait_until_finished)
+            self.cache.record_server(server, deleted=True)
+            return True
         return False
 
     def wait_for_server_running(self, server_name: str, timeout: int = 300) -> bool:
@@ -140,24 +385,18 @@ class RunnerDeployer:
         Returns:
             True if server is running, False if timeout
         """
-        print(f"Waiting for server {server_name} to be running...")
-        start_time = time.time()
-
-        while time.time() - start_time < timeout:
-            server = self.client.servers.get_by_name(server_name)
-            if server and server.status == Server.STATUS_RUNNING:
-                print(f"Server {server_name} is running!")
-                return True
-            elif server:
-                print(f"Server status: {server.status}...")
-            time.sleep(5)
-
-        print(f"Timeout waiting for server {server_name}")
+        log(f"Waiting for server {server_name} to be running...")
+        server = self.watcher.wait_for_status(server_name, STATUS_RUNNING, timeout=timeout)
+        if server and server.status == STATUS_RUNNING:
+            log(f"Server {server_name} is running!")
+            return True
+
+        log(f"Timeout waiting for server {server_name}")
         return False
 
     def get_server_public_ip(self, server_name: str) -> Optional[str]:
         """Get the public IPv4 address of a server."""
-        server = self.client.servers.get_by_name(server_name)
+        server = self.watcher.get(server_name) or hcloud_call(self.client.servers.get_by_name, server_name)
         if server and server.public_net:
             return server.public_net.ipv4.ip
         return None
@@ -166,53 +405,110 @@ class RunnerDeployer:
         self,
         host: str,
         command: str,
-        timeout: int = 300
+        timeout: int = 300,
+        stall_timeout: Optional[int] = DEFAULT_STALL_TIMEOUT,
     ) -> tuple[int, str, str]:
         """
         Execute a command via SSH.
 
+        Output is streamed line by line to the log while the command runs.
+        Only the last OUTPUT_TAIL_LINES lines are kept and returned. The
+        command is killed (exit code -1) if it runs longer than timeout, or
+        prints nothing for stall_timeout seconds.
+
         Args:
             host: Server IP address
             command: Command to execute
             timeout: Command timeout in seconds
+            stall_timeout: Seconds without output before giving up (None: never)
 
         Returns:
-            Tuple of (exit_code, stdout, stderr)
+            Tuple of (exit_code, stdout tail, stderr tail)
         """
-        # Parse SSH key
-        key_file = io.StringIO(self.ssh_key_content)
-        ssh_key = paramiko.RSAKey.from_private_key(key_file)
-
-        # Create SSH client
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-        try:
-            print(f"Connecting to {host}...")
-            ssh.connect(
-                hostname=host,
-                username='root',
-                pkey=ssh_key,
-                timeout=30,
-            )
-
-            print(f"Executing: {command}")
-            stdin, stdout, stderr = ssh.exec_command(
-                command,
-                timeout=timeout,
-                get_pty=True
-            )
-
-            # Wait for command to complete
-            exit_status = stdout.channel.recv_exit_status()
-
-            stdout_text = stdout.read().decode('utf-8')
-            stderr_text = stderr.read().decode('utf-8')
-
-            return exit_status, stdout_text, stderr_text
-
-        finally:
-            ssh.close()
+        import paramiko
+
+        # Reuse the pooled connection; if it died since the last command,
+        # reconnect once. Only opening the channel is retried, so a command
+        # is never run twice.
+        for attempt in range(2):
+            ssh = self.ssh_pool.get(host)
+            try:
+                log(f"Executing: {command}")
+                stdin, stdout, stderr = ssh.exec_command(
+                    command,
+                    timeout=timeout,
+                    get_pty=True
+                )
+                break
+            except (paramiko.SSHException, EOFError, OSError) as e:
+                self.ssh_pool.drop(host)
+                if attempt:
+                    raise
+                log(f"Connection to {host} lost ({e}), reconnecting...")
+
+        channel = stdout.channel
+        streams = {
+            "stdout": (channel.recv_ready, channel.recv, collections.deque(maxlen=OUTPUT_TAIL_LINES)),
+            "stderr": (channel.recv_stderr_ready, channel.recv_stderr, collections.deque(maxlen=OUTPUT_TAIL_LINES)),
+        }
+        partial = {name: b"" for name in streams}
+
+        def drain() -> bool:
+            """Log and keep whatever both streams have buffered; True if anything came."""
+            received = False
+            for name, (ready, recv, tail) in streams.items():
+                while ready():
+                    data = recv(32768)
+                    if not data:
+                        break
+                    received = True
+                    *lines, partial[name] = (partial[name] + data).split(b"\n")
+                    for line in lines:
+                        text = line.decode('utf-8', errors='replace').rstrip("\r")
+                        tail.append(text)
+                        log(f"  | {text}")
+            return received
+
+        start_time = last_output = time.time()
+        exit_status = None
+        while True:
+            received = drain()
+
+            now = time.time()
+            if received:
+                last_output = now
+            elif channel.exit_status_ready():
+                exit_status = channel.recv_exit_status()
+                # Output may have arrived since the drain above; read on
+                # until EOF (or a second passes) so the tail is complete
+                deadline = time.time() + 1.0
+                while drain() or (not channel.eof_received and time.time() < deadline):
+                    select.select([channel], [], [], 0.1)
+                break
+            elif now - start_time > timeout:
+                log(f"Command timed out after {timeout}s: {command}")
+                break
+            elif stall_timeout is not None and now - last_output > stall_timeout:
+                log(f"No output for {stall_timeout}s, assuming the command is hung: {command}")
+                break
+            else:
+                # Sleep until the channel has data (or a second passes)
+                select.select([channel], [], [], 1.0)
+
+        if exit_status is None:
+            channel.close()
+            exit_status = -1
+
+        for name, (_, _, tail) in streams.items():
+            if partial[name]:
+                tail.append(partial[name].decode('utf-8', errors='replace').rstrip("\r"))
+                log(f"  | {tail[-1]}")
+
+        return (
+            exit_status,
+            "\n".join(streams["stdout"][2]),
+            "\n".join(streams["stderr"][2]),
+        )
 
     def install_armbian_config(self, host: str) -> bool:
         """
@@ -224,7 +520,7 @@ class RunnerDeployer:
         Returns:
             True if successful, False otherwise
         """
-        print(f"Installing armbian-config on {host}...")
+        log(f"Installing armbian-config on {host}...")
 
         # Commands to install armbian-config
         commands = [
@@ -239,12 +535,13 @@ class RunnerDeployer:
         for cmd in commands:
             exit_code, stdout, stderr = self.execute_ssh_command(host, cmd, timeout=180)
             if exit_code != 0:
-                print(f"Command failed: {cmd}")
-                print(f"stderr: {stderr}")
+                log(f"Command failed: {cmd}")
+                log(f"Last output: {stdout}")
+                log(f"stderr: {stderr}")
                 return False
-            print(f"Command succeeded: {cmd}")
+            log(f"Command succeeded: {cmd}")
 
-        print("armbian-config installed successfully!")
+        log("armbian-config installed successfully!")
         return True
 
     def install_runner(self, host: str) -> bool:
@@ -257,7 +554,7 @@ class RunnerDeployer:
         Returns:
             True if successful, False otherwise
         """
-        print(f"Installing GitHub Actions runner on {host}...")
+        log(f"Installing GitHub Actions runner on {host}...")
 
         # Build the armbian-config command
         cmd = (
@@ -276,13 +573,12 @@ class RunnerDeployer:
         exit_code, stdout, stderr = self.execute_ssh_command(host, cmd, timeout=600)
 
         if exit_code != 0:
-            print(f"Runner installation failed!")
-            print(f"stdout: {stdout}")
-            print(f"stderr: {stderr}")
+            log(f"Runner installation failed!")
+            log(f"Last output: {stdout}")
+            log(f"stderr: {stderr}")
             return False
 
-        print("Runner installed successfully!")
-        print(f"Output: {stdout}")
+        log("Runner installed successfully!")
         return True
 
     def deploy_server(
@@ -303,63 +599,93 @@ class RunnerDeployer:
             Dictionary with server info or None on failure
         """
         if machine_index < 0 or machine_index >= len(MACHINE_NAMES):
-            print(f"Error: machine_index {machine_index} out of range (0-{len(MACHINE_NAMES)-1})")
+            log(f"Error: machine_index {machine_index} out of range (0-{len(MACHINE_NAMES)-1})")
             return None
 
         server_name = MACHINE_NAMES[machine_index]
-        print(f"\n=== Deploying server: {server_name} ===")
+        _log_context.prefix = f"[{server_name}] "
+        try:
+            return self._deploy_server(server_name, machine_index, delete_existing, install_runner)
+        finally:
+            _log_context.prefix = ""
+
+    def _deploy_server(
+        self,
+        server_name: str,
+        machine_index: int,
+        delete_existing: bool,
+        install_runner: bool,
+    ) -> Optional[Dict]:
+        log(f"=== Deploying server: {server_name} ===")
 
         # Check if server exists
         if self.server_exists(server_name):
             if delete_existing:
-                print(f"Server {server_name} already exists, deleting...")
+                log(f"Server {server_name} already exists, deleting...")
                 self.delete_server(server_name)
-                time.sleep(5)  # Wait for deletion to complete
             else:
-                print(f"Server {server_name} already exists. Use --delete-existing to replace it.")
+                log(f"Server {server_name} already exists. Use --delete-existing to replace it.")
                 return None
 
         # Get SSH key
         ssh_key = self.get_ssh_key()
         if not ssh_key:
-            print(f"Error: SSH key '{self.ssh_key_name}' not found in Hetzner!")
+            log(f"Error: SSH key '{self.ssh_key_name}' not found in Hetzner!")
             return None
 
-        print(f"Creating server {server_name}...")
-        print(f"  Type: {self.machine_type}")
-        print(f"  Image: {self.image_name}")
-        print(f"  SSH Key: {ssh_key.name}")
+        log(f"Creating server {server_name}...")
+        log(f"  Type: {self.machine_type}")
+        log(f"  Image: {self.image_name}")
+        log(f"  SSH Key: {ssh_key.name}")
+
+        from hcloud.images import Image
+        from hcloud.server_types import ServerType
 
         # Create server
         try:
-            response = self.client.servers.create(
+            response = hcloud_call(
+                self.client.servers.create,
+                idempotent=False,
                 name=server_name,
                 server_type=ServerType(name=self.machine_type),
                 image=Image(name=self.image_name),
                 ssh_keys=[ssh_key],
+                labels=dict(SERVER_LABELS),
             )
+            self.cache.record_server(response.server)
+            self.watcher.kick()
 
             # Wait for server to be created
-            print(f"Waiting for server creation to complete...")
-            response.action.wait(timeout=300)  # type: ignore
-            print(f"Server {server_name} created!")
+            log(f"Waiting for server creation to complete...")
+            hcloud_call(response.action.wait_until_finished)
+            log(f"Server {server_name} created!")
 
         except Exception as e:
-            print(f"Error creating server: {e}")
+            log(f"Error creating server: {e}")
             return None
 
         # Wait for server to be running
         if not self.wait_for_server_running(server_name):
-            print("Server did not become running in time")
+            log("Server did not become running in time")
             return None
 
         # Get server IP
         server_ip = self.get_server_public_ip(server_name)
         if not server_ip:
-            print("Could not get server IP")
+            log("Could not get server IP")
             return None
 
-        print(f"Server IP: {server_ip}")
+        log(f"Server IP: {server_ip}")
+
+        # RUNNING only means the VM has booted; start the install the
+        # moment sshd answers instead of letting the first connect time out
+        if install_runner:
+            log(f"Waiting for SSH on {server_ip}...")
+            started = time.time()
+            if not self.ssh_prober.wait(server_ip):
+                log(f"SSH on {server_ip} did not come up within {DEFAULT_SSH_READY_TIMEOUT}s")
+                return None
+            log(f"SSH is up after {time.time() - started:.1f}s")
 
         result = {
             "name": server_name,
@@ -374,12 +700,62 @@ class RunnerDeployer:
                 if self.install_runner(server_ip):
                     result["runner_installed"] = True
                 else:
-                    print("Runner installation failed!")
+                    log("Runner installation failed!")
             else:
-                print("armbian-config installation failed!")
+                log("armbian-config installation failed!")
 
         return result
 
+    def deploy_servers(
+        self,
+        machine_indices: List[int],
+        delete_existing: bool = False,
+        install_runner: bool = True,
+        workers: int = DEFAULT_WORKERS,
+    ) -> Dict[str, List]:
+        """
+        Deploy several servers concurrently.
+
+        Every host runs its own create, wait and SSH install pipeline on a
+        worker thread, so deploying N hosts takes about as long as the
+        slowest one. A host that fails (or raises) is reported and does not
+        stop the others.
+
+        Args:
+            machine_indices: Indexes into MACHINE_NAMES array
+            delete_existing: Delete existing servers if present
+            install_runner: Whether to install the runners
+            workers: Maximum number of hosts deployed at the same time
+
+        Returns:
+            Dictionary with the deployed servers and the names that failed
+        """
+        results: Dict[int, Dict] = {}
+        failed: List[str] = []
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {
+                pool.submit(self.deploy_server, index, delete_existing, install_runner): index
+                for index in machine_indices
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                name = MACHINE_NAMES[index]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    log(f"[{name}] Deployment failed: {e}")
+                    result = None
+                if result:
+                    results[index] = result
+                else:
+                    failed.append(name)
+
+        return {
+            "servers": [results[index] for index in machine_indices if index in results],
+            "failed": sorted(failed, key=MACHINE_NAMES.index),
+        }
+
     def delete_all_servers(self) -> int:
         """
         Delete all runner servers.
@@ -387,17 +763,12 @@ class RunnerDeployer:
         Returns:
             Number of servers deleted
         """
-        print("=== Deleting all runner servers ===")
-        deleted = 0
-        servers = self.client.servers.get_all()
-
-        for server in servers:
-            if server.name in MACHINE_NAMES:
-                print(f"Deleting server: {server.name} (ID: {server.id})")
-                self.client.servers.delete(server)
-                deleted += 1
+        log("=== Deleting all runner servers ===")
+        names = [server.name for server in self.cache.servers() if server.name in MACHINE_NAMES]
+        result = delete_servers(self.client, names, cache=self.cache, parallelism=len(MACHINE_NAMES))
+        deleted = result["deleted"]
 
-        print(f"Deleted {deleted} server(s)")
+        log(f"Deleted {deleted} server(s)")
         return deleted
 
 
@@ -489,6 +860,12 @@ def main():
         default="",
         help="GitHub organization name"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Number of machines deployed concurrently (default: {DEFAULT_WORKERS})"
+    )
     parser.add_argument(
         "--output-json",
         action="store_true",
@@ -509,6 +886,15 @@ def main():
         print("Error: GitHub token required (use --github-token or GITHUB_TOKEN env var)")
         sys.exit(1)
 
+    if args.action != "disable":
+        # Fail before any server is created, not when the first SSH starts
+        try:
+            import paramiko  # noqa: F401
+        except ImportError as e:
+            print(f"Missing required library: {e}")
+            print("Install with: pip install hcloud paramiko")
+            sys.exit(1)
+
     # Create deployer
     deployer = RunnerDeployer(
         hetzner_token=hetzner_token,
@@ -523,32 +909,38 @@ def main():
         label_primary=args.label_primary,
         label_secondary=args.label_secondary,
         organisation=args.organisation,
+        # Deleting needs three endpoints; skip loading the SDK for it
+        client=HetznerREST(hetzner_token) if args.action == "disable" else None,
     )
 
     # Execute action
-    if args.action == "disable":
-        deleted = deployer.delete_all_servers()
-        result = {"action": "disable", "deleted": deleted}
-    else:  # enable or deploy
-        results = []
-        for i in range(args.machine_count):
-            machine_id = args.machine_id + i
-            if machine_id >= len(MACHINE_NAMES):
-                print(f"Warning: machine_id {machine_id} exceeds available names (max: {len(MACHINE_NAMES)-1})")
-                break
-
-            result = deployer.deploy_server(
-                machine_index=machine_id,
+    try:
+        if args.action == "disable":
+            deleted = deployer.delete_all_servers()
+            result = {"action": "disable", "deleted": deleted}
+        else:  # enable or deploy
+            machine_ids = []
+            for i in range(args.machine_count):
+                machine_id = args.machine_id + i
+                if machine_id >= len(MACHINE_NAMES):
+                    print(f"Warning: machine_id {machine_id} exceeds available names (max: {len(MACHINE_NAMES)-1})")
+                    break
+                machine_ids.append(machine_id)
+
+            deployed = deployer.deploy_servers(
+                machine_ids,
                 delete_existing=args.delete_existing,
                 install_runner=True,
+                workers=args.workers,
             )
-            if result:
-                results.append(result)
 
-        result = {
-            "action": args.action,
-            "servers": results,
-        }
+            result = {
+                "action": args.action,
+                "servers": deployed["servers"],
+                "failed": deployed["failed"],
+            }
+    finally:
+        deployer.close()
 
     # Output
     if args.output_json:
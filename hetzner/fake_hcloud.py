@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Simulated Hetzner Cloud API
+
+A stand-in for the parts of hcloud.Client that create_servers.py and
+deploy_runners.py use (servers, ssh_keys, server_types, images, actions),
+so the provisioning code paths can be exercised and timed without
+creating real VMs. Latencies, per-location capacity and API errors are
+configurable; every call is counted and the peak number of calls in
+flight is recorded.
+"""
+
+from __future__ import annotations
+
+import itertools
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Optional
+
+from hcloud._exceptions import APIException
+
+
+LOCATIONS = ["fsn1", "nbg1", "hel1"]
+
+SERVER_TYPES = {
+    "cax11": "arm",
+    "cax21": "arm",
+    "cax31": "arm",
+    "cax41": "arm",
+    "cpx31": "x86",
+}
+
+# Seconds each endpoint takes to answer, roughly what api.hetzner.cloud does
+DEFAULT_LATENCY = {
+    "default": 0.05,
+    "servers.create": 0.4,
+    "servers.get_all": 0.1,
+    "server_types.get_all": 0.1,
+}
+
+# Requests per hour, as reported in the RateLimit-* headers
+RATE_LIMIT = 3600
+
+
+def _matches(labels: dict, label_selector: Optional[str]) -> bool:
+    """Return True if labels satisfy an "a=b,c=d" label selector."""
+    if not label_selector:
+        return True
+    for term in label_selector.split(","):
+        key, _, value = term.partition("=")
+        if labels.get(key) != value:
+            return False
+    return True
+
+
+class FakeAction:
+    """An action that finishes `duration` seconds after it was started."""
+
+    def __init__(self, api: FakeHetzner, action_id: int, command: str, duration: float):
+        self.api = api
+        self.id = action_id
+        self.command = command
+        self.started = time.time()
+        self.duration = duration
+
+    @property
+    def status(self) -> str:
+        return "success" if time.time() >= self.started + self.duration else "running"
+
+    def wait_until_finished(self, max_retries: int = 100) -> None:
+        """Poll the action like hcloud does, one API call per poll."""
+        for _ in range(max_retries):
+            self.api._call("actions.get")
+            remaining = self.started + self.duration - time.time()
+            if remaining <= 0:
+                return
+            time.sleep(min(self.api.poll_interval, remaining))
+        raise APIException("timeout", f"Action {self.id} did not finish", None)
+
+
+class _ServersAPI:
+    def __init__(self, api: FakeHetzner):
+        self.api = api
+
+    def get_all(self, label_selector: Optional[str] = None, **kwargs) -> list:
+        self.api._call("servers.get_all")
+        with self.api._lock:
+            return [
+                self.api._server_view(record) for record in self.api.server_records.values()
+                if _matches(record["labels"], label_selector)
+            ]
+
+    def get_by_name(self, name: str):
+        self.api._call("servers.get_by_name")
+        with self.api._lock:
+            record = self.api.server_records.get(name)
+            return self.api._server_view(record) if record else None
+
+    def create(self, name: str, server_type, image, ssh_keys=None, user_data=None,
+               labels=None, location=None, **kwargs):
+        self.api._call("servers.create")
+        return self.api._create_server(
+            name,
+            server_type.name,
+            getattr(image, "name", None) or str(image.id),
+            labels or {},
+            location.name if location else None,
+            len(user_data or ""),
+        )
+
+    def update(self, server, name: Optional[str] = None, labels: Optional[dict] = None):
+        self.api._call("servers.update")
+        with self.api._lock:
+            record = self.api.server_records.get(server.name)
+            if record is None:
+                raise APIException("not_found", f"server {server.name} not found", None)
+            if labels is not None:
+                record["labels"] = dict(labels)
+            if name is not None and name != server.name:
+                self.api.server_records[name] = self.api.server_records.pop(server.name)
+                record["name"] = name
+            return self.api._server_view(record)
+
+    def delete(self, server):
+        self.api._call("servers.delete")
+        return self.api._delete_server(server.name)
+
+    def create_image(self, server, description=None, type="snapshot", labels=None, **kwargs):
+        self.api._call("servers.create_image")
+        return self.api._create_image(server.name, description, labels or {})
+
+
+class _ImagesAPI:
+    def __init__(self, api: FakeHetzner):
+        self.api = api
+
+    def get_all(self, type=None, label_selector: Optional[str] = None, **kwargs) -> list:
+        self.api._call("images.get_all")
+        with self.api._lock:
+            return [
+                image for image in self.api.image_records.values()
+                if _matches(image.labels, label_selector)
+            ]
+
+    def delete(self, image) -> bool:
+        self.api._call("images.delete")
+        with self.api._lock:
+            self.api.image_records.pop(image.id, None)
+        return True
+
+
+class _ListAPI:
+    def __init__(self, api: FakeHetzner, endpoint: str, items):
+        self.api = api
+        self.endpoint = endpoint
+        self.items = items
+
+    def get_all(self, **kwargs) -> list:
+        self.api._call(self.endpoint)
+        return self.items()
+
+
+class FakeHetzner:
+    """
+    In-memory Hetzner project with an hcloud.Client-like interface.
+
+    Pass an instance wherever the scripts take a Client. Servers boot in
+    action_time + boot_time seconds; deletes finish after delete_time.
+
+    Args:
+        latency: Seconds per call, a float for every endpoint or a dict of
+            endpoint name (e.g. "servers.create") to seconds, with "default"
+            for the rest
+        capacity: Servers that can still be created per type and location,
+            e.g. {"cax41": {"fsn1": 2}}. Types not listed are unlimited in
+            every location. A create beyond it fails with
+            resource_unavailable, as Hetzner does.
+        error_rate: Probability that a call is rejected, a float for every
+            endpoint or a dict like latency
+        error_code: Error code of injected failures
+        action_time: Seconds until a create action finishes
+        boot_time: Seconds from a finished create action until "running"
+        delete_time: Seconds until a delete action finishes
+        poll_interval: Seconds between polls in Action.wait_until_finished()
+        ssh_keys: Names of the SSH keys in the project
+        seed: Seed for error injection, so runs are repeatable
+    """
+
+    def __init__(
+        self,
+        latency=None,
+        capacity: Optional[dict] = None,
+        error_rate=0.0,
+        error_code: str = "rate_limit_exceeded",
+        action_time: float = 1.0,
+        boot_time: float = 2.0,
+        delete_time: float = 1.0,
+        poll_interval: float = 1.0,
+        ssh_keys: tuple = ("UPLOAD", "TORRENT"),
+        seed: int = 0,
+    ):
+        self.latency = latency if latency is not None else dict(DEFAULT_LATENCY)
+        self.capacity = {t: dict(locations) for t, locations in (capacity or {}).items()}
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.action_time = action_time
+        self.boot_time = boot_time
+        self.delete_time = delete_time
+        self.poll_interval = poll_interval
+
+        # Project state; .servers and .images are the API, as on hcloud.Client
+        self.server_records: dict[str, dict] = {}
+        self.image_records: dict[int, SimpleNamespace] = {}
+        self.actions: dict[int, FakeAction] = {}
+        self.ssh_key_list = [SimpleNamespace(id=i + 1, name=name) for i, name in enumerate(ssh_keys)]
+
+        self.calls: dict[str, int] = {}
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.peak_servers = 0
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1000)
+        self._random = random.Random(seed)
+        self._remaining = RATE_LIMIT
+        self._forced_errors: dict[str, list[str]] = {}
+
+        # Same surface as hcloud.Client
+        self.servers = _ServersAPI(self)
+        self.images = _ImagesAPI(self)
+        self.ssh_keys = _ListAPI(self, "ssh_keys.get_all", lambda: list(self.ssh_key_list))
+        self.server_types = _ListAPI(self, "server_types.get_all", self._server_types)
+        self._client = SimpleNamespace(_session=SimpleNamespace(hooks={"response": []}))
+
+    @property
+    def total_calls(self) -> int:
+        with self._lock:
+            return sum(self.calls.values())
+
+    def fail_next(self, endpoint: str, code: str, times: int = 1) -> None:
+        """Make the next `times` calls to endpoint fail with error code."""
+        with self._lock:
+            self._forced_errors.setdefault(endpoint, []).extend([code] * times)
+
+    def reset_stats(self) -> None:
+        """Zero the call counters, e.g. between benchmark phases."""
+        with self._lock:
+            self.calls.clear()
+            self.errors = 0
+            self.peak_in_flight = self.in_flight
+            self.peak_servers = len(self.server_records)
+
+    def request(self, method: str, url: str, params: Optional[dict] = None, **kwargs) -> dict:
+        """The raw endpoints the scripts call; only GET /actions is supported."""
+        if method != "GET" or url != "/actions":
+            raise APIException("not_found", f"{method} {url} is not simulated", None)
+        self._call("actions.get_all")
+        ids = set((params or {}).get("id", []))
+        with self._lock:
+            actions = [self.actions[i] for i in ids if i in self.actions]
+        return {"actions": [{"id": action.id, "status": action.status} for action in actions]}
+
+    def _setting(self, value, endpoint: str) -> float:
+        if isinstance(value, dict):
+            return value.get(endpoint, value.get("default", 0.0))
+        return value
+
+    def _call(self, endpoint: str) -> None:
+        """Account for one API call: count it, delay it, maybe reject it."""
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            self._remaining = max(0, self._remaining - 1)
+            forced = self._forced_errors.get(endpoint)
+            error = forced.pop(0) if forced else None
+            if error is None and self._random.random() < self._setting(self.error_rate, endpoint):
+                error = self.error_code
+        try:
+            time.sleep(self._setting(self.latency, endpoint))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        headers = {
+            "RateLimit-Limit": str(RATE_LIMIT),
+            "RateLimit-Remaining": str(self._remaining),
+            "RateLimit-Reset": str(int(time.time()) + 1),
+        }
+        for hook in self._client._session.hooks["response"]:
+            hook(SimpleNamespace(headers=headers))
+        if error:
+            with self._lock:
+                self.errors += 1
+            raise APIException(error, f"Injected {error} on {endpoint}", None)
+
+    def _action(self, command: str, duration: float) -> FakeAction:
+        action = FakeAction(self, next(self._ids), command, duration)
+        self.actions[action.id] = action
+        return action
+
+    def _available(self, server_type: str, location: str) -> bool:
+        return self.capacity.get(server_type, {}).get(location, 1) > 0
+
+    def _server_types(self) -> list:
+        return [
+            SimpleNamespace(
+                id=i + 1,
+                name=name,
+                architecture=architecture,
+                locations=[
+                    SimpleNamespace(location=SimpleNamespace(name=location), available=self._available(name, location))
+                    for location in LOCATIONS
+                ],
+            )
+            for i, (name, architecture) in enumerate(SERVER_TYPES.items())
+        ]
+
+    def _create_server(self, name, server_type, image, labels, location, user_data_size):
+        with self._lock:
+            if name in self.server_records:
+                raise APIException("uniqueness_error", "server name is already used", None)
+            if server_type not in SERVER_TYPES:
+                raise APIException("invalid_input", f"unknown server type {server_type}", None)
+            candidates = [location] if location else LOCATIONS
+            location = next((loc for loc in candidates if self._available(server_type, loc)), None)
+            if location is None:
+                raise APIException(
+                    "resource_unavailable",
+                    f"server type {server_type} is unavailable in {'/'.join(candidates)}",
+                    None,
+                )
+            if server_type in self.capacity:
+                self.capacity[server_type][location] -= 1
+            server_id = next(self._ids)
+            action = self._action("create_server", self.action_time)
+            self.server_records[name] = {
+                "id": server_id,
+                "name": name,
+                "server_type": server_type,
+                "image": image,
+                "labels": dict(labels),
+                "location": location,
+                "user_data_size": user_data_size,
+                "running_at": action.started + self.action_time + self.boot_time,
+            }
+            self.peak_servers = max(self.peak_servers, len(self.server_records))
+            server = self._server_view(self.server_records[name])
+        return SimpleNamespace(server=server, action=action, next_actions=[], root_password=None)
+
+    def _delete_server(self, name: str) -> FakeAction:
+        with self._lock:
+            record = self.server_records.pop(name, None)
+            if record is None:
+                raise APIException("not_found", f"server {name} not found", None)
+            if record["server_type"] in self.capacity:
+                capacity = self.capacity[record["server_type"]]
+                capacity[record["location"]] = capacity.get(record["location"], 0) + 1
+            return self._action("delete_server", self.delete_time)
+
+    def _create_image(self, server_name: str, description, labels: dict):
+        with self._lock:
+            record = self.server_records.get(server_name)
+            if record is None:
+                raise APIException("not_found", f"server {server_name} not found", None)
+            image = SimpleNamespace(
+                id=next(self._ids),
+                name=None,
+                description=description,
+                labels=dict(labels),
+                architecture=SERVER_TYPES[record["server_type"]],
+                status="available",
+                created=time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime()),
+            )
+            self.image_records[image.id] = image
+            action = self._action("create_image", self.action_time)
+        return SimpleNamespace(image=image, action=action)
+
+    def _server_view(self, record: dict) -> SimpleNamespace:
+        """A snapshot of a server, like the objects hcloud returns."""
+        running = time.time() >= record["running_at"]
+        return SimpleNamespace(
+            id=record["id"],
+            name=record["name"],
+            status="running" if running else "initializing",
+            labels=dict(record["labels"]),
+            server_type=SimpleNamespace(name=record["server_type"]),
+            image=SimpleNamespace(name=record["image"]),
+            datacenter=SimpleNamespace(location=SimpleNamespace(name=record["location"])),
+            public_net=SimpleNamespace(
+                ipv4=SimpleNamespace(ip=f"192.0.2.{record['id'] % 254 + 1}"),
+            ),
+        )
+